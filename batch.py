@@ -0,0 +1,200 @@
+"""Runs many independent headless matches, sharded across worker processes.
+
+    python batch.py --matches 64 --ticks 3600
+    python batch.py --matches 64 --ticks 3600 --lockstep --sync 600
+
+Every match gets its own seeded World and scripted bots, so a seed always plays out the same way.
+Free-running shards play their matches to the end on their own; lockstep shards advance all their
+matches together and report back after every sync interval.
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+import pygame
+
+KEYS = (pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d, pygame.K_f,
+        pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_j)
+
+
+class BotScript:
+    """Holds a few random keys for period ticks at a time, the same ones for the same seed.
+
+    A class rather than a closure so it can be sent to worker processes.
+    """
+
+    def __init__(self, seed: int, period: int = 15, keys: int = 3):
+        self.seed = seed
+        self.period = period
+        self.keys = keys
+
+    def __call__(self, tick: int) -> list[int]:
+        return random.Random(hash((self.seed, tick // self.period))).sample(KEYS, self.keys)
+
+
+def make_runner(seed: int, script_factory, dt: float):
+    # Imported here so worker processes pay for pygame and the assets only once they start.
+    from headless import HeadlessRunner
+    return HeadlessRunner(script_factory(seed), dt=dt, seed=seed)
+
+
+def get_results(seed: int, runner) -> dict:
+    return {"seed": seed, **runner.results()}
+
+
+def run_shard(seeds: list[int], ticks: int, script_factory=BotScript, dt: float = 1 / 60) -> list[dict]:
+    """Play every match of a shard to the end, one after the other."""
+    results = []
+    for seed in seeds:
+        runner = make_runner(seed, script_factory, dt)
+        runner.run(ticks)
+        results.append(get_results(seed, runner))
+    return results
+
+
+def run_lockstep_shard(connection, seeds: list[int], script_factory, dt: float):
+    """Worker loop of a lockstep shard: step all its matches by each tick count received, then report."""
+    runners = [make_runner(seed, script_factory, dt) for seed in seeds]
+    while True:
+        ticks = connection.recv()
+        if ticks is None:
+            break
+        for _ in range(ticks):
+            for runner in runners:
+                runner.step()
+        connection.send([get_results(seed, runner) for seed, runner in zip(seeds, runners)])
+    connection.close()
+
+
+def make_shards(seeds: list[int], processes: int) -> list[list[int]]:
+    shards = [seeds[index::processes] for index in range(processes)]
+    return [shard for shard in shards if shard]
+
+
+def order_results(seeds: list[int], shards: list[list[dict]]) -> list[dict]:
+    by_seed = {result["seed"]: result for shard in shards for result in shard}
+    return [by_seed[seed] for seed in seeds]
+
+
+class LockstepBatch:
+    """Matches kept alive in one worker process per shard and advanced together."""
+
+    def __init__(self, seeds: list[int], processes: int = None, script_factory=BotScript, dt: float = 1 / 60):
+        self.seeds = list(seeds)
+        self.ticks = 0
+        context = multiprocessing.get_context("fork")
+        self.connections = []
+        self.workers = []
+        for shard in make_shards(self.seeds, processes or multiprocessing.cpu_count()):
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(target=run_lockstep_shard, args=(worker_connection, shard, script_factory, dt),
+                                     daemon=True)
+            worker.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.workers.append(worker)
+
+    def step(self, ticks: int = 1) -> list[dict]:
+        """Advance every match by ticks and return their results in seed order."""
+        for connection in self.connections:
+            connection.send(ticks)
+        shards = [connection.recv() for connection in self.connections]
+        self.ticks += ticks
+        return order_results(self.seeds, shards)
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for worker in self.workers:
+            worker.join()
+        self.connections.clear()
+        self.workers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_batch(seeds: list[int], ticks: int, processes: int = None, script_factory=BotScript, dt: float = 1 / 60,
+              lockstep: bool = False, sync: int = None, on_sync=None) -> list[dict]:
+    """Play one match per seed for ticks and return their results in seed order.
+
+    In lockstep mode the matches stop every sync ticks and on_sync, if given, gets the tick and the
+    results so far.
+    """
+    seeds = list(seeds)
+    processes = processes or multiprocessing.cpu_count()
+    if not lockstep:
+        context = multiprocessing.get_context("fork")
+        shards = make_shards(seeds, processes)
+        pool = context.Pool(len(shards))
+        results = pool.starmap(run_shard, [(shard, ticks, script_factory, dt) for shard in shards])
+        pool.close()
+        pool.join()
+        return order_results(seeds, results)
+
+    sync = sync or ticks
+    with LockstepBatch(seeds, processes, script_factory, dt) as batch:
+        results = []
+        while batch.ticks < ticks:
+            results = batch.step(min(sync, ticks - batch.ticks))
+            if on_sync is not None:
+                on_sync(batch.ticks, results)
+    return results
+
+
+def aggregate(results: list[dict]) -> dict:
+    """Totals and per-match means over the results of a batch."""
+    count = max(1, len(results))
+    scores = [sum(result["scores"]) for result in results]
+    kills = sum(result["kills"] for result in results)
+    bullets_fired = sum(result["bullets_fired"] for result in results)
+    return {
+        "matches": len(results),
+        "ticks": sum(result["ticks"] for result in results),
+        "kills": kills,
+        "bullets_fired": bullets_fired,
+        "bullets_live": sum(result["bullets_live"] for result in results),
+        "mean_score": sum(scores) / count,
+        "best_score": max(scores, default=0),
+        "mean_kills": kills / count,
+        "mean_bullets_fired": bullets_fired / count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many headless matches across processes.")
+    parser.add_argument("--matches", type=int, default=16)
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match, the others count up from it")
+    parser.add_argument("--processes", type=int, help="worker processes, one per CPU by default")
+    parser.add_argument("--lockstep", action="store_true", help="advance all matches together")
+    parser.add_argument("--sync", type=int, help="ticks between lockstep reports")
+    args = parser.parse_args()
+
+    def report(tick, results):
+        summary = aggregate(results)
+        print(f"tick {tick}: {summary['kills']} kills, {summary['bullets_fired']} bullets, "
+              f"mean score {summary['mean_score']:.1f}")
+
+    seeds = range(args.seed, args.seed + args.matches)
+    start = time.perf_counter()
+    results = run_batch(seeds, args.ticks, args.processes, lockstep=args.lockstep, sync=args.sync,
+                        on_sync=report if args.lockstep else None)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        print(f"seed {result['seed']}: scores {result['scores']}, {result['kills']} kills, "
+              f"{result['bullets_fired']} bullets fired, {result['bullets_live']} live")
+    summary = aggregate(results)
+    print(f"{summary['matches']} matches, {summary['ticks']} ticks in {elapsed:.3f}s "
+          f"({summary['ticks'] / elapsed:.0f} ticks/s), {summary['kills']} kills, "
+          f"mean score {summary['mean_score']:.1f}, best {summary['best_score']}")
+
+
+if __name__ == "__main__":
+    main()
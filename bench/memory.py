@@ -0,0 +1,117 @@
+"""Memory used per entity and per component instance.
+
+    python -m bench.memory --output memory.json
+    python -m bench.memory --baseline memory.json
+
+Entities are measured with tracemalloc as the bytes allocated while building many of them, once their
+animations are in the cache, so shared assets are not counted. Components are measured as the size of
+one instance plus its __dict__, if it has one.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+from bench.run import setup_display, get_commit
+from ecs import Component
+from game.entity import Player, Enemy, Bullet
+
+ENTITY_FACTORIES = {
+    "Player": lambda: Player(),
+    "Enemy": lambda: Enemy(random.Random(0)),
+    "Bullet": lambda: Bullet((0, 0), (1, 0)),
+}
+
+
+def measure_entity(factory, count: int) -> float:
+    """Mean bytes allocated per entity while building count of them."""
+    factory()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = [factory() for _ in range(count)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del entities
+    return allocated / count
+
+
+def get_instance_size(instance) -> int:
+    size = sys.getsizeof(instance)
+    if hasattr(instance, "__dict__"):
+        size += sys.getsizeof(instance.__dict__)
+    return size
+
+
+def get_component_types() -> list[type]:
+    types = []
+    pending = [Component]
+    while pending:
+        component_type = pending.pop(0)
+        for subclass in component_type.__subclasses__():
+            if subclass not in types:
+                types.append(subclass)
+                pending.append(subclass)
+    return types
+
+
+def measure_components() -> dict[str, int]:
+    sizes = {}
+    for component_type in get_component_types():
+        try:
+            instance = component_type()
+        except TypeError:
+            # Columnar components need a store to live in.
+            continue
+        sizes[component_type.__name__] = get_instance_size(instance)
+    return dict(sorted(sizes.items()))
+
+
+def compare(baseline: dict, results: dict):
+    print(f"{'measure':40} {'baseline':>10} {'current':>10} {'saved':>8}")
+    rows = []
+    for section in ("entities", "components"):
+        old = baseline.get(section, {})
+        for name, size in results[section].items():
+            if name in old:
+                rows.append((f"{section} {name}", old[name], size))
+    for name, old, new in rows:
+        saved = 1 - new / old if old else 0.0
+        print(f"{name:40} {old:9.0f}B {new:9.0f}B {saved:7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory used per entity and component.")
+    parser.add_argument("--count", type=int, default=1000, help="entities built per entity type")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous JSON result")
+    args = parser.parse_args()
+
+    setup_display()
+    results = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "time": time.time(),
+        "entities": {name: measure_entity(factory, args.count) for name, factory in ENTITY_FACTORIES.items()},
+        "components": measure_components(),
+    }
+    for name, size in results["entities"].items():
+        print(f"{name}: {size:.0f} bytes per entity")
+    for name, size in results["components"].items():
+        print(f"  {name}: {size} bytes")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            compare(json.load(baseline_file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Benchmarks for the ecs core and the game systems.
+
+    python -m bench.run --output bench.json
+    python -m bench.run --baseline bench.json
+
+Every scenario builds a headless world with the given number of players, enemies and bullets and
+times each system in registration order. Results are written as JSON so runs on different commits
+can be compared with --baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+
+import pygame
+
+from ecs import World
+from common import AnimationState, AnimationCycleCompletedSignal, SpriteSheet, Position, State, ScriptedInput, \
+    animation_cache, Renderer
+from game.bootstrap import preload_assets, add_systems
+from game.component import PlayerKeyBindings, Joined, CooldownDict
+from game.constant import GameConstant, AssetConstant
+from game.entity import Player, Enemy, Bullet
+
+DEFAULT_SCENARIOS = ["2,10,100", "2,100,1000", "4,1000,10000"]
+
+
+def setup_display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    if not pygame.display.get_surface():
+        pygame.display.set_mode((1, 1))
+    preload_assets()
+
+
+def build_world(players: int, enemies: int, bullets: int, render: bool = False, seed: int = 0) -> World:
+    random.seed(seed)
+    renderer = None
+    if render:
+        renderer = Renderer(pygame.Surface((GameConstant.WIDTH_BOUNDARY, GameConstant.HEIGHT_BOUNDARY)))
+    world = World()
+    add_systems(world, renderer, ScriptedInput())
+
+    for _ in range(players):
+        player = Player("idle", "idle")
+        player.add_component(PlayerKeyBindings({
+            "UP": pygame.K_w,
+            "DOWN": pygame.K_s,
+            "LEFT": pygame.K_a,
+            "RIGHT": pygame.K_d,
+            "ATTACK": pygame.K_f,
+        }))
+        player.add_component(Joined())
+        position = player.get_component(Position)
+        position.x = random.uniform(0, GameConstant.WIDTH_BOUNDARY)
+        position.y = random.uniform(0, GameConstant.HEIGHT_BOUNDARY)
+        world.add_entity(player)
+
+    for _ in range(enemies):
+        world.add_entity(Enemy())
+
+    for _ in range(bullets):
+        position = (random.uniform(0, GameConstant.WIDTH_BOUNDARY), random.uniform(0, GameConstant.HEIGHT_BOUNDARY))
+        direction = (random.uniform(-1, 1), random.uniform(-1, 1))
+        bullet = Bullet(position, direction)
+        bullet.get_component(State).current = "run"
+        world.add_entity(bullet)
+
+    return world
+
+
+def time_systems(world: World, ticks: int) -> dict:
+    """Mean seconds per tick of each system, stepping the world as World.process does.
+
+    Deferred signals are flushed after each system, and the handlers' time counts towards the
+    system that queued them.
+    """
+    systems = world.system_container.systems
+    dispatcher = world.signal_dispatcher
+    totals = [0.0] * len(systems)
+    for _ in range(ticks):
+        for index, system in enumerate(systems):
+            start = time.perf_counter()
+            system.process()
+            if dispatcher.queue:
+                dispatcher.flush()
+            totals[index] += time.perf_counter() - start
+        world.clock.advance()
+
+    result = {}
+    for system, total in zip(systems, totals):
+        result[type(system).__name__] = total / ticks
+    return result
+
+
+def measure(func, number: int = 100, repeat: int = 5) -> float:
+    """Best mean seconds per call over repeat batches of number calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run_scenario(players: int, enemies: int, bullets: int, ticks: int, render: bool) -> dict:
+    start = time.perf_counter()
+    world = build_world(players, enemies, bullets, render)
+    build_time = time.perf_counter() - start
+    systems = time_systems(world, ticks)
+    return {
+        "players": players,
+        "enemies": enemies,
+        "bullets": bullets,
+        "ticks": ticks,
+        "build": build_time,
+        "systems": systems,
+        "frame": sum(systems.values()),
+    }
+
+
+def run_micro(size: int) -> dict:
+    world = build_world(2, size // 10, size)
+    container = world.entity_container
+    signal = AnimationCycleCompletedSignal(container.get_entities(Bullet)[0],
+                                           container.get_entities(Bullet)[0].get_component(AnimationState)
+                                           .get_animation("run"))
+    spritesheet = SpriteSheet(*AssetConstant.PLAYER[:2])
+    frame_names = list(spritesheet.metadata["frames"])
+
+    def load_cold():
+        animation_cache.evict(*AssetConstant.BULLET, force=True)
+        AnimationState.load(*AssetConstant.BULLET).release()
+
+    def dispatch():
+        world.dispatch_signal(signal)
+        world.signal_dispatcher.flush()
+
+    def parse_all():
+        for name in frame_names:
+            spritesheet.parse_sprites(name)
+
+    return {
+        "size": size,
+        "query_position_state": measure(lambda: container.query(Position, State)),
+        "get_entities_bullet": measure(lambda: container.get_entities(Bullet)),
+        "get_entities_with_cooldown": measure(lambda: container.get_entities_with_component(CooldownDict)),
+        "dispatch_animation_cycle": measure(dispatch, number=10000),
+        "animation_state_load_cold": measure(load_cold, number=5),
+        "animation_state_load_warm": measure(lambda: AnimationState.load(*AssetConstant.BULLET).release(), 10000),
+        "spritesheet_parse_sprites": measure(parse_all, number=5),
+    }
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(baseline: dict, results: dict):
+    print(f"{'benchmark':60} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    rows = []
+    old_scenarios = {(s["players"], s["enemies"], s["bullets"]): s for s in baseline.get("scenarios", [])}
+    for scenario in results["scenarios"]:
+        key = (scenario["players"], scenario["enemies"], scenario["bullets"])
+        if key not in old_scenarios:
+            continue
+        name = "p{}_e{}_b{}".format(*key)
+        old = old_scenarios[key]
+        rows.append((f"{name} frame", old["frame"], scenario["frame"]))
+        for system, seconds in scenario["systems"].items():
+            if system in old["systems"]:
+                rows.append((f"{name} {system}", old["systems"][system], seconds))
+    old_micro = baseline.get("micro", {})
+    for name, seconds in results.get("micro", {}).items():
+        if name != "size" and name in old_micro:
+            rows.append((f"micro {name}", old_micro[name], seconds))
+
+    for name, old, new in rows:
+        ratio = new / old if old else float("inf")
+        print(f"{name:60} {old * 1e3:10.4f}ms {new * 1e3:10.4f}ms {ratio:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ecs core and the game systems.")
+    parser.add_argument("--scenario", action="append",
+                        help="players,enemies,bullets (repeatable, up to 100000 entities)")
+    parser.add_argument("--ticks", type=int, default=60)
+    parser.add_argument("--render", action="store_true", help="draw to an offscreen canvas")
+    parser.add_argument("--micro-size", type=int, default=10000)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous JSON result")
+    args = parser.parse_args()
+
+    setup_display()
+    results = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "time": time.time(),
+        "scenarios": [],
+    }
+    for scenario in args.scenario or DEFAULT_SCENARIOS:
+        players, enemies, bullets = (int(value) for value in scenario.split(","))
+        result = run_scenario(players, enemies, bullets, args.ticks, args.render)
+        print(f"p{players}_e{enemies}_b{bullets}: {result['frame'] * 1e3:.3f}ms per frame")
+        results["scenarios"].append(result)
+    results["micro"] = run_micro(args.micro_size)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            compare(json.load(baseline_file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
-from state import *
-from position import *
-from sprite import *
-from animation import *
-from event import *
-from signal import *
+from .state import *
+from .position import *
+from .sprite import *
+from .atlas import *
+from .asset import *
+from .transform import *
+from .render import *
+from .animation import *
+from .bundle import *
+from .event import *
+from .input import *
+from .signal import *
+from .spatial import *
+from .profiler import *
 
 
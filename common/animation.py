@@ -1,21 +1,24 @@
 import json
+from functools import partial
 from typing import Optional
 
-import pygame
 from pygame.math import Vector2
 
-import signal
 from game.component import LookingDirection
-from ecs import Component, System
-from common import Sprite, Position, SpriteSheet, State
+from ecs import Component, System, Entity, EntityAddedSignal, EntityRemovedSignal, ComponentAddedSignal, \
+    ComponentRemovedSignal
+from common import Sprite, Position, SpriteSheet, State, AssetCache, AssetLoader, TransformCache, TextureAtlas, \
+    Renderer
+from common.signal import AnimationCycleCompletedSignal
 from game.constant import AnimationConstant
 
 
 class Animation:
+    __slots__ = ("name", "sprites", "max_index", "total_frames", "step", "offset", "flip", "scale")
+
     def __init__(self, name: str, sprites: list[Sprite], step: float = 0.3, offset: Vector2 = Vector2(), flip=False, scale=1):
         self.name = name
         self.sprites = sprites
-        self.index = 0
         self.max_index = len(sprites) - 1
         self.total_frames = len(sprites)
         self.step = step
@@ -23,25 +26,163 @@ class Animation:
         self.flip = flip
         self.scale = scale
 
-    def get_current_sprite(self) -> Optional[Sprite]:
-        return self.sprites[int(self.index)]
+    def get_sprite(self, index: float) -> Optional[Sprite]:
+        return self.sprites[int(index)]
+
+    def is_last_sprite(self, index: float):
+        return int(index) >= self.max_index
+
+
+def load_animations(spritesheet_path, spritesheet_metadata_path, state_metadata_path,
+                    atlas: TextureAtlas = None) -> dict[str, Animation]:
+    spritesheet = SpriteSheet(spritesheet_path, spritesheet_metadata_path, atlas)
+    with open(state_metadata_path) as meta_file:
+        metadata = json.load(meta_file)
+    meta_file.close()
+
+    animations = {}
+    states = metadata["states"]
+
+    for item in states.items():
+        sprites = []
+        step = AnimationConstant.STEP
+        state, sprite_names = item
+        offset = Vector2()
+        flip = False
+        scale = 1
 
-    def is_last_sprite(self):
-        return int(self.index) >= self.max_index
+        if type(sprite_names) == str:
+            sprites.extend(spritesheet.parse_sprites(sprite_names))
+        elif type(sprite_names) == dict:
+            sprites.extend(spritesheet.parse_sprites(sprite_names["path"]))
+            if "step" in sprite_names:
+                step = sprite_names["step"]
+            if "offset" in sprite_names:
+                offset_dat = sprite_names["offset"]
+                if "x" in offset_dat:
+                    offset.x = offset_dat["x"]
+                if "y" in offset_dat:
+                    offset.y = offset_dat["y"]
+            if "flip" in sprite_names:
+                flip = sprite_names["flip"]
+            if "scale" in sprite_names:
+                scale = sprite_names["scale"]
+        else:
+            for sprite_name in sprite_names:
+                sprites.extend(spritesheet.parse_sprites(sprite_name))
+        animations[state] = Animation(state, sprites, step, offset, flip, scale)
 
-    def reset(self):
-        self.index = 0
+    return animations
+
+
+animation_cache = AssetCache(load_animations)
+# Once started, AnimationState.load hands out placeholders for animations that are not decoded yet.
+animation_loader = AssetLoader(animation_cache, AnimationConstant.LOADER_WORKERS)
+
+
+def use_atlas(atlas: Optional[TextureAtlas]):
+    """Slice animations loaded from now on out of the atlas pages, or out of their own sheets again with None."""
+    animation_cache.loader = partial(load_animations, atlas=atlas)
 
 
 class AnimationRotation(Component):
+    __slots__ = ("rotation",)
+
     def __init__(self):
         self.rotation = 0
 
 
+class RenderLayer(Component):
+    """Layer an entity is drawn in, read when it joins the draw order.
+
+    Changing layer afterwards takes effect once the entity, or its AnimationState, is removed and added again.
+    """
+
+    __slots__ = ("layer",)
+
+    def __init__(self, layer: int = AnimationConstant.ACTOR_LAYER):
+        self.layer = layer
+
+
+class RenderOrder:
+    """Entities with an AnimationState, kept in draw order from one frame to the next.
+
+    Layers are drawn from lowest to highest. The actor layer is sorted by y, again only once an actor's
+    Position changed; since most entities only move a few pixels per tick, last frame's order is nearly
+    sorted and re-sorting it is close to linear. Other layers keep the order their entities were added
+    in. Entities join and leave the order as they are added to and removed from the world, or gain and
+    lose their AnimationState while in it; their RenderLayer is read when they join.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.layers: dict[int, list[Entity]] = {}
+        self.removed = set()
+        world.register_handler(EntityAddedSignal, self.on_entity_added)
+        world.register_handler(EntityRemovedSignal, self.on_entity_removed)
+        world.register_handler(ComponentAddedSignal, self.on_animation_state_added, component_type=AnimationState)
+        world.register_handler(ComponentRemovedSignal, self.on_animation_state_removed,
+                               component_type=AnimationState)
+        for entity in world.query(AnimationState):
+            self.add(entity)
+
+    @staticmethod
+    def get_layer(entity: Entity) -> int:
+        render_layer = entity.get_component(RenderLayer)
+        return render_layer.layer if render_layer else AnimationConstant.ACTOR_LAYER
+
+    def add(self, entity: Entity):
+        self.layers.setdefault(self.get_layer(entity), []).append(entity)
+
+    def flush(self):
+        for members in self.layers.values():
+            members[:] = [entity for entity in members if entity not in self.removed]
+        self.removed.clear()
+
+    def join(self, entity: Entity):
+        if entity in self.removed:
+            # Pooled entities can come back within the frame they were removed in.
+            self.flush()
+        self.add(entity)
+
+    def on_entity_added(self, signal: EntityAddedSignal):
+        if signal.entity.has_component(AnimationState):
+            self.join(signal.entity)
+
+    def on_entity_removed(self, signal: EntityRemovedSignal):
+        if signal.entity.has_component(AnimationState):
+            self.removed.add(signal.entity)
+
+    def on_animation_state_added(self, signal: ComponentAddedSignal):
+        self.join(signal.entity)
+
+    def on_animation_state_removed(self, signal: ComponentRemovedSignal):
+        self.removed.add(signal.entity)
+
+    def get_entities(self) -> list[Entity]:
+        if self.removed:
+            self.flush()
+        moved = self.world.changed(Position, self)
+        actors = self.layers.get(AnimationConstant.ACTOR_LAYER)
+        if actors and any(self.get_layer(entity) == AnimationConstant.ACTOR_LAYER for entity in moved):
+            actors.sort(key=lambda e: (e.get_component(Position).y, e.id))
+        entities = []
+        for layer in sorted(self.layers):
+            entities.extend(self.layers[layer])
+        return entities
+
+
 class AnimationState(Component):
-    def __init__(self):
-        self.states: dict[str, Animation] = {}
+    __slots__ = ("states", "current_state", "indices", "key", "loading")
+
+    def __init__(self, states: dict[str, Animation] = None, key: tuple = None):
+        # Animations are shared between every entity loaded from the same asset,
+        # so the playback cursor of each state lives here instead.
+        self.states: dict[str, Animation] = states if states is not None else {}
         self.current_state = None
+        self.indices: dict[str, float] = {}
+        self.key = key
+        self.loading = False
 
     def get_current_animation(self) -> Optional[Animation]:
         if not self.current_state or self.current_state not in self.states:
@@ -51,67 +192,66 @@ class AnimationState(Component):
     def get_animation(self, state: str) -> Optional[Animation]:
         return self.states[state]
 
+    def get_index(self, state: str) -> float:
+        return self.indices.get(state, 0)
+
+    def set_index(self, state: str, index: float):
+        self.indices[state] = index
+
+    def reset(self, state: str):
+        self.indices[state] = 0
+
+    def swap(self, key: tuple):
+        """Take the animations of a placeholder once they are in the cache."""
+        if not self.loading:
+            return
+        self.loading = False
+        self.key, self.states = animation_cache.acquire(*key)
+
+    def release(self):
+        self.loading = False
+        if self.key is None:
+            return
+        animation_cache.release(self.key)
+        self.key = None
+
     @staticmethod
     def load(spritesheet_path, spritesheet_metadata_path, state_metadata_path):
-        spritesheet = SpriteSheet(spritesheet_path, spritesheet_metadata_path)
-        with open(state_metadata_path) as meta_file:
-            metadata = json.load(meta_file)
-        meta_file.close()
-
-        animation_states = {}
-        states = metadata["states"]
-
-        for item in states.items():
-            sprites = []
-            step = AnimationConstant.STEP
-            state, sprite_names = item
-            offset = Vector2()
-            flip = False
-            scale = 1
+        paths = (spritesheet_path, spritesheet_metadata_path, state_metadata_path)
+        if animation_loader.running and not animation_cache.is_loaded(*paths):
+            # Nothing is drawn for the placeholder until AnimationLoader swaps its animations in.
+            animation_state = AnimationState()
+            animation_state.loading = True
+            animation_loader.request(*paths, callback=animation_state.swap)
+            return animation_state
+        key, states = animation_cache.acquire(*paths)
+        return AnimationState(states, key)
 
-            if type(sprite_names) == str:
-                sprites.extend(spritesheet.parse_sprites(sprite_names))
-            elif type(sprite_names) == dict:
-                sprites.extend(spritesheet.parse_sprites(sprite_names["path"]))
-                if "step" in sprite_names:
-                    step = sprite_names["step"]
-                if "offset" in sprite_names:
-                    offset_dat = sprite_names["offset"]
-                    if "x" in offset_dat:
-                        offset.x = offset_dat["x"]
-                    if "y" in offset_dat:
-                        offset.y = offset_dat["y"]
-                if "flip" in sprite_names:
-                    flip = sprite_names["flip"]
-                if "scale" in sprite_names:
-                    scale = sprite_names["scale"]
-            else:
-                for sprite_name in sprite_names:
-                    sprites.extend(spritesheet.parse_sprites(sprite_name))
-            animation_states[state] = Animation(state, sprites, step, offset, flip, scale)
-
-        res = AnimationState()
-        res.states = animation_states
-
-        return res
+
+class AnimationLoader(System):
+    """Hands animations decoded in the background over to the placeholders waiting for them."""
+
+    def process(self):
+        if animation_loader.running:
+            animation_loader.poll()
 
 
 class AnimationPlayer(System):
-    def __init__(self, world, window):
+    def __init__(self, world, renderer: Renderer, transform_cache: TransformCache = None):
         super().__init__(world)
-        self.window = window
+        self.renderer = renderer
+        self.transform_cache = transform_cache if transform_cache is not None else TransformCache()
+        self.render_order = RenderOrder(world)
 
     def process(self):
-        entities = self.world.entity_container.get_entities_with_component(AnimationState)
-        entities.sort(key=lambda e: e.get_component(Position).y)
-        for entity in entities:
+        for entity in self.render_order.get_entities():
             animation_state = entity.get_component(AnimationState)
             state = entity.get_component(State)
 
             # If new state, reset the previous animation
             prev_animation = animation_state.get_current_animation()
             if state.current is not animation_state.current_state and prev_animation:
-                prev_animation.reset()
+                animation_state.reset(animation_state.current_state)
 
             animation_state.current_state = state.current
             if not state.current:
@@ -119,12 +259,14 @@ class AnimationPlayer(System):
 
             next_animation = animation_state.get_current_animation()
             current_sprite = None
+            index = 0
             if next_animation:
-                current_sprite = next_animation.get_current_sprite()
+                current_sprite = next_animation.get_sprite(animation_state.get_index(state.current))
                 step = current_sprite.step
                 if step <= 0:
                     step = next_animation.step
-                next_animation.index = (next_animation.index + step) % next_animation.total_frames
+                index = (animation_state.get_index(state.current) + step) % next_animation.total_frames
+                animation_state.set_index(state.current, index)
 
             position = entity.get_component(Position)
             looking_direction = entity.get_component(LookingDirection)
@@ -135,22 +277,19 @@ class AnimationPlayer(System):
                 offset = next_animation.offset
                 scale = next_animation.scale
 
-            if current_sprite is not None:
-                surface = next_animation.get_current_sprite().surface
-                pos_x = position.x + offset.x + next_animation.get_current_sprite().offset_x
-                pos_y = position.y + offset.y + next_animation.get_current_sprite().offset_y
-
-                if next_animation.flip:
-                    surface = pygame.transform.flip(surface, True, False)
-                if scale != 1:
-                    surface = pygame.transform.scale(surface, (surface.get_size()[0] * scale, surface.get_size()[1] * scale))
-
-                if looking_direction and looking_direction.x == -1:
-                    surface = pygame.transform.flip(surface, True, False)
-                elif animation_rotation and animation_rotation.rotation != 0:
-                    surface = pygame.transform.rotate(surface, animation_rotation.rotation)
-                self.window.blit(surface, (pos_x, pos_y))
-
-            if next_animation and next_animation.is_last_sprite():
-                self.world.dispatch_signal(signal.AnimationCycleCompletedSignal(entity, next_animation))
-                next_animation.reset()
+            if current_sprite is not None and self.renderer is not None:
+                sprite = next_animation.get_sprite(index)
+                pos_x = position.x + offset.x + sprite.offset_x
+                pos_y = position.y + offset.y + sprite.offset_y
+
+                mirror = looking_direction is not None and looking_direction.x == -1
+                rotation = animation_rotation.rotation if animation_rotation else 0
+                surface, area = self.transform_cache.get(sprite, next_animation.flip, scale, mirror, rotation)
+                self.renderer.draw(surface, (pos_x, pos_y), area)
+
+            if next_animation and next_animation.is_last_sprite(index):
+                self.world.dispatch_signal(AnimationCycleCompletedSignal(entity, next_animation))
+                animation_state.reset(next_animation.name)
+
+        if self.renderer is not None:
+            self.renderer.submit()
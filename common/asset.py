@@ -0,0 +1,148 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+class AssetCache:
+    """Process-wide cache of decoded assets, keyed by their source paths."""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.entries = {}
+        self.references = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*paths) -> tuple:
+        return tuple(os.path.normpath(path) for path in paths)
+
+    def acquire(self, *paths):
+        key = self.make_key(*paths)
+        entry = self.get(*key)
+        self.references[key] += 1
+        return key, entry
+
+    def release(self, key: tuple):
+        if key not in self.references:
+            return
+        self.references[key] = max(0, self.references[key] - 1)
+
+    def get(self, *paths):
+        key = self.make_key(*paths)
+        if key in self.entries:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.entries[key] = self.loader(*key)
+            self.references[key] = 0
+        return self.entries[key]
+
+    def preload(self, *keys):
+        for paths in keys:
+            key = self.make_key(*paths)
+            if key in self.entries:
+                continue
+            self.misses += 1
+            self.entries[key] = self.loader(*key)
+            self.references[key] = 0
+
+    def install(self, key: tuple, entry):
+        if key in self.entries:
+            return
+        self.entries[key] = entry
+        self.references[key] = 0
+
+    def is_loaded(self, *paths) -> bool:
+        return self.make_key(*paths) in self.entries
+
+    def evict(self, *paths, force=False) -> bool:
+        key = self.make_key(*paths)
+        if key not in self.entries:
+            return False
+        if self.references[key] > 0 and not force:
+            return False
+        self.entries.pop(key)
+        self.references.pop(key)
+        return True
+
+    def evict_unused(self) -> int:
+        unused = [key for key, count in self.references.items() if count == 0]
+        for key in unused:
+            self.entries.pop(key)
+            self.references.pop(key)
+        return len(unused)
+
+    def clear(self):
+        self.entries.clear()
+        self.references.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "references": sum(self.references.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class AssetLoader:
+    """Runs the loader of an AssetCache on a thread pool.
+
+    Decoded entries only reach the cache, and the callbacks waiting on them only run, when poll is called,
+    so both happen on the game thread.
+    """
+
+    def __init__(self, cache: AssetCache, workers: int):
+        self.cache = cache
+        self.workers = workers
+        self.executor = None
+        self.futures: dict[tuple, Future] = {}
+        self.callbacks: dict[tuple, list] = {}
+
+    @property
+    def running(self) -> bool:
+        return self.executor is not None
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="asset-loader")
+
+    def request(self, *paths, callback=None) -> tuple:
+        """Queue paths for loading; callback gets the key once the entry is in the cache."""
+        key = self.cache.make_key(*paths)
+        if key in self.cache.entries:
+            if callback is not None:
+                callback(key)
+            return key
+        if key not in self.futures:
+            self.start()
+            self.futures[key] = self.executor.submit(self.cache.loader, *key)
+            self.callbacks[key] = []
+        if callback is not None:
+            self.callbacks[key].append(callback)
+        return key
+
+    def is_pending(self, *paths) -> bool:
+        return self.cache.make_key(*paths) in self.futures
+
+    def poll(self) -> int:
+        """Install every finished entry and run its callbacks. Returns how many finished."""
+        done = [key for key, future in self.futures.items() if future.done()]
+        for key in done:
+            self.cache.install(key, self.futures.pop(key).result())
+            for callback in self.callbacks.pop(key):
+                callback(key)
+        return len(done)
+
+    def wait(self):
+        wait(list(self.futures.values()))
+        self.poll()
+
+    def shutdown(self):
+        if self.executor is None:
+            return
+        self.wait()
+        self.executor.shutdown()
+        self.executor = None
@@ -0,0 +1,117 @@
+import json
+import os
+from typing import Optional
+
+import pygame
+from pygame.surface import Surface
+
+from common import SpriteSheet
+from game.constant import AnimationConstant
+
+
+def get_state_sprite_names(state_metadata_path) -> list[str]:
+    """Names of every sprite a state file refers to, in the order the states use them."""
+    with open(state_metadata_path) as meta_file:
+        metadata = json.load(meta_file)
+    meta_file.close()
+
+    names = []
+    for sprite_names in metadata["states"].values():
+        if type(sprite_names) == str:
+            names.append(sprite_names)
+        elif type(sprite_names) == dict:
+            names.append(sprite_names["path"])
+        else:
+            names.extend(sprite_names)
+    return names
+
+
+class TextureAtlas:
+    """Frames of several sprite sheets shelf-packed into a few large page surfaces."""
+
+    def __init__(self, page_size: int = AnimationConstant.ATLAS_PAGE_SIZE,
+                 padding: int = AnimationConstant.ATLAS_PADDING, colorkey=(255, 255, 255)):
+        self.page_size = page_size
+        self.padding = padding
+        self.colorkey = colorkey
+        self.pages: list[Surface] = []
+        self.regions: dict[tuple, tuple[int, pygame.Rect]] = {}
+        self.sheets = set()
+
+    @staticmethod
+    def make_key(sheet_path, rect) -> tuple:
+        return os.path.normpath(sheet_path), tuple(rect)
+
+    @staticmethod
+    def build(*assets, page_size: int = AnimationConstant.ATLAS_PAGE_SIZE,
+              padding: int = AnimationConstant.ATLAS_PADDING) -> "TextureAtlas":
+        """Pack every frame the state files of the given (sheet, sheet metadata, state metadata) triples use."""
+        atlas = TextureAtlas(page_size, padding)
+        frames = {}
+        for spritesheet_path, spritesheet_metadata_path, state_metadata_path in assets:
+            spritesheet = SpriteSheet(spritesheet_path, spritesheet_metadata_path)
+            for sprite_name in get_state_sprite_names(state_metadata_path):
+                for rect, _, _, _ in spritesheet.parse_frames(sprite_name):
+                    frames[TextureAtlas.make_key(spritesheet_path, rect)] = spritesheet
+        atlas.add(frames)
+        return atlas
+
+    def pack(self, sizes: list[tuple[int, int]]) -> tuple[list[tuple[int, int, int]], list[list[int]]]:
+        """Place sizes shelf by shelf, returning each (page, x, y) and the used size of every page."""
+        placements = []
+        pages = []
+        x = y = shelf = 0
+        for w, h in sizes:
+            w += self.padding
+            h += self.padding
+            if pages and x + w > self.page_size:
+                x, y, shelf = 0, y + shelf, 0
+            if not pages or y + h > self.page_size:
+                pages.append([0, 0])
+                x = y = shelf = 0
+            placements.append((len(pages) - 1, x, y))
+            x += w
+            shelf = max(shelf, h)
+            pages[-1][0] = max(pages[-1][0], x)
+            pages[-1][1] = max(pages[-1][1], y + shelf)
+        return placements, pages
+
+    def add(self, frames: dict[tuple, SpriteSheet]):
+        """Pack frames, keyed by make_key, onto new pages; tallest first keeps the shelves tight."""
+        order = sorted((key for key in frames if key not in self.regions), key=lambda k: (-k[1][3], -k[1][2]))
+        placements, page_sizes = self.pack([(rect[2], rect[3]) for _, rect in order])
+
+        first_page = len(self.pages)
+        for size in page_sizes:
+            page = pygame.Surface(size).convert()
+            page.fill(self.colorkey)
+            page.set_colorkey(self.colorkey, pygame.RLEACCEL)
+            self.pages.append(page)
+
+        for key, (page_index, x, y) in zip(order, placements):
+            spritesheet = frames[key]
+            page = self.pages[first_page + page_index]
+            area = pygame.Rect(x, y, key[1][2], key[1][3])
+            # Pixels outside the sheet come out black, as they do for SpriteSheet.image_at.
+            page.fill((0, 0, 0), area)
+            page.blit(spritesheet.sheet, area, pygame.Rect(key[1]))
+            self.regions[key] = (first_page + page_index, area)
+            self.sheets.add(key[0])
+
+    def has_sheet(self, sheet_path) -> bool:
+        return os.path.normpath(sheet_path) in self.sheets
+
+    def find(self, sheet_path, rect) -> Optional[tuple[Surface, pygame.Rect]]:
+        region = self.regions.get(self.make_key(sheet_path, rect))
+        if region is None:
+            return None
+        page_index, area = region
+        return self.pages[page_index], area
+
+    def stats(self) -> dict:
+        return {
+            "pages": len(self.pages),
+            "frames": len(self.regions),
+            "size": sum(page.get_width() * page.get_height() * page.get_bytesize() for page in self.pages),
+            "frame_size": sum(area.w * area.h * self.pages[page].get_bytesize() for page, area in self.regions.values()),
+        }
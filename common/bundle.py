@@ -0,0 +1,179 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from functools import partial
+from typing import Optional
+
+import pygame
+from pygame.math import Vector2
+
+from common import Sprite, TextureAtlas, Animation, load_animations, animation_cache
+from game.constant import AnimationConstant, AssetConstant
+
+# Bundle layout, little endian:
+#   header: magic, version, size of the whole bundle, source mtimes, page count, frame count, state count
+#   pages:  width, height, offset of the RGBX pixels
+#   frames: page, rect on the sheet, area on the page, offset, step
+#   states: name length, step, offset, flip, scale, sprite count, then the name and the frame index of each sprite
+#   pixels: every page, row by row, starting on a 4 byte boundary
+MAGIC = b"SBDL"
+VERSION = 2
+HEADER = struct.Struct("<4sHQ3dHHH")
+PAGE = struct.Struct("<HHI")
+FRAME = struct.Struct("<H4h2H3d")
+STATE = struct.Struct("<Hddd?dH")
+PIXEL_FORMAT = "RGBX"
+COLORKEY = (255, 255, 255)
+
+
+def get_bundle_path(directory: str, spritesheet_path, spritesheet_metadata_path, state_metadata_path) -> str:
+    key = "\0".join(os.path.normpath(path) for path in (spritesheet_path, spritesheet_metadata_path, state_metadata_path))
+    name = os.path.splitext(os.path.basename(spritesheet_path))[0]
+    return os.path.join(directory, f"{name}-{hashlib.md5(key.encode()).hexdigest()[:8]}.bundle")
+
+
+def get_mtimes(*paths) -> tuple[float, ...]:
+    return tuple(os.stat(path).st_mtime for path in paths)
+
+
+def compile_bundle(spritesheet_path, spritesheet_metadata_path, state_metadata_path, bundle_path: str):
+    """Slice a (sheet, sheet metadata, state metadata) triple once and write it out as a bundle."""
+    sources = (spritesheet_path, spritesheet_metadata_path, state_metadata_path)
+    animations = load_animations(*sources)
+
+    # Sprites repeated through duplicates keep a single frame entry; equal rects share their pixels.
+    frames: dict[Sprite, int] = {}
+    rects: dict[tuple, int] = {}
+    for animation in animations.values():
+        for sprite in animation.sprites:
+            if sprite not in frames:
+                frames[sprite] = len(frames)
+                rects.setdefault((sprite.x, sprite.y, sprite.w, sprite.h), len(rects))
+
+    packer = TextureAtlas(AnimationConstant.ATLAS_PAGE_SIZE, AnimationConstant.ATLAS_PADDING)
+    placements, page_sizes = packer.pack([(rect[2], rect[3]) for rect in rects])
+    pages = [pygame.Surface(size).convert() for size in page_sizes]
+    for page in pages:
+        page.fill(COLORKEY)
+    surfaces = {(sprite.x, sprite.y, sprite.w, sprite.h): sprite.surface for sprite in frames}
+    for rect, (page_index, x, y) in zip(rects, placements):
+        pages[page_index].blit(surfaces[rect], (x, y))
+
+    # The header is filled in once the size of the pixels is known.
+    tables = bytearray(HEADER.size)
+    table_size = HEADER.size + PAGE.size * len(pages) + FRAME.size * len(frames)
+    for animation in animations.values():
+        table_size += STATE.size + len(animation.name.encode()) + 2 * len(animation.sprites)
+    pixel_offset = table_size + -table_size % 4
+    pixels = []
+    for page in pages:
+        data = bytearray(pygame.image.tobytes(page, PIXEL_FORMAT))
+        # The padding byte takes part in the colorkey comparison of the mapped surface.
+        data[3::4] = bytes(len(data) // 4)
+        pixels.append(data)
+    for page, data in zip(pages, pixels):
+        tables += PAGE.pack(page.get_width(), page.get_height(), pixel_offset)
+        pixel_offset += len(data)
+    HEADER.pack_into(tables, 0, MAGIC, VERSION, max(pixel_offset, table_size + -table_size % 4),
+                     *get_mtimes(*sources), len(pages), len(frames), len(animations))
+
+    for sprite in frames:
+        rect = (sprite.x, sprite.y, sprite.w, sprite.h)
+        page_index, x, y = placements[rects[rect]]
+        tables += FRAME.pack(page_index, *rect, x, y, sprite.offset_x, sprite.offset_y, sprite.step)
+
+    for animation in animations.values():
+        name = animation.name.encode()
+        tables += STATE.pack(len(name), animation.step, animation.offset.x, animation.offset.y, animation.flip,
+                             animation.scale, len(animation.sprites))
+        tables += name
+        tables += struct.pack(f"<{len(animation.sprites)}H", *(frames[sprite] for sprite in animation.sprites))
+
+    tables += bytes(-len(tables) % 4)
+    os.makedirs(os.path.dirname(bundle_path) or ".", exist_ok=True)
+    # A file of its own, since several processes may compile the same bundle at once.
+    descriptor, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(bundle_path) or ".")
+    try:
+        with os.fdopen(descriptor, "wb") as bundle_file:
+            bundle_file.write(tables)
+            for data in pixels:
+                bundle_file.write(data)
+        # Replacing the file leaves bundles that are already mapped untouched.
+        os.replace(temporary_path, bundle_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def read_bundle(bundle_path: str, sources: tuple = None) -> Optional[dict[str, Animation]]:
+    """Map a bundle and wrap its pages into surfaces, or None if it is missing or older than its sources.
+
+    Once a display exists each page is converted to its pixel format, a copy made once here rather than a
+    conversion on every blit from the mapped RGBX pixels.
+    """
+    if not os.path.isfile(bundle_path):
+        return None
+    with open(bundle_path, "rb") as bundle_file:
+        data = memoryview(mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_READ))
+    bundle_file.close()
+
+    if len(data) < HEADER.size:
+        return None
+    magic, version, size, *header = HEADER.unpack_from(data)
+    mtimes, (page_count, frame_count, state_count) = tuple(header[:3]), header[3:]
+    if magic != MAGIC or version != VERSION:
+        return None
+    if size != len(data):
+        # Cut short or otherwise damaged.
+        return None
+    if sources is not None and mtimes != get_mtimes(*sources):
+        return None
+
+    position = HEADER.size
+    pages = []
+    for _ in range(page_count):
+        width, height, offset = PAGE.unpack_from(data, position)
+        position += PAGE.size
+        page = pygame.image.frombuffer(data[offset:offset + width * height * 4], (width, height), PIXEL_FORMAT)
+        if pygame.display.get_surface() is not None:
+            page = page.convert()
+        page.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        pages.append(page)
+
+    sprites = []
+    for _ in range(frame_count):
+        page_index, x, y, w, h, area_x, area_y, offset_x, offset_y, step = FRAME.unpack_from(data, position)
+        position += FRAME.size
+        sprites.append(Sprite(pages[page_index], (x, y, w, h), (offset_x, offset_y), step,
+                              pygame.Rect(area_x, area_y, w, h)))
+
+    animations = {}
+    for _ in range(state_count):
+        name_length, step, offset_x, offset_y, flip, scale, sprite_count = STATE.unpack_from(data, position)
+        position += STATE.size
+        name = bytes(data[position:position + name_length]).decode()
+        position += name_length
+        indices = struct.unpack_from(f"<{sprite_count}H", data, position)
+        position += 2 * sprite_count
+        animations[name] = Animation(name, [sprites[index] for index in indices], step, Vector2(offset_x, offset_y),
+                                     flip, scale)
+    return animations
+
+
+def load_bundle(spritesheet_path, spritesheet_metadata_path, state_metadata_path,
+                directory: str = AssetConstant.BUNDLE_DIRECTORY) -> dict[str, Animation]:
+    """Animations of a triple read from its bundle, compiling the bundle first when it is missing or stale."""
+    sources = (spritesheet_path, spritesheet_metadata_path, state_metadata_path)
+    bundle_path = get_bundle_path(directory, *sources)
+    animations = read_bundle(bundle_path, sources)
+    if animations is None:
+        compile_bundle(*sources, bundle_path)
+        animations = read_bundle(bundle_path, sources)
+    return animations
+
+
+def use_bundles(directory: str = AssetConstant.BUNDLE_DIRECTORY):
+    """Load animations from now on through precompiled bundles kept in directory."""
+    animation_cache.loader = partial(load_bundle, directory=directory)
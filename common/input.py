@@ -0,0 +1,41 @@
+import pygame
+
+from ecs import System
+
+
+class KeyState:
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key) -> bool:
+        return key in self.pressed
+
+
+class ScriptedInput:
+    """Key source for runs without a keyboard.
+
+    The script is either a list with the keys held on each tick or a function from the tick to those keys.
+    """
+
+    def __init__(self, script=None):
+        self.script = script
+        self.tick = 0
+
+    def __call__(self) -> KeyState:
+        pressed = ()
+        if callable(self.script):
+            pressed = self.script(self.tick)
+        elif self.script is not None and self.tick < len(self.script):
+            pressed = self.script[self.tick]
+        self.tick += 1
+        return KeyState(pressed)
+
+
+class KeyboardState(System):
+    def __init__(self, world, source=None):
+        super().__init__(world)
+        self.source = source if source is not None else pygame.key.get_pressed
+        self.key_pressed = KeyState()
+
+    def process(self):
+        self.key_pressed = self.source()
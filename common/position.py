@@ -6,6 +6,8 @@ from ecs import Component
 
 
 class Position(Component, Vector2):
+    __slots__ = ("w", "h")
+
     def __init__(self):
         super().__init__()
         self.x = 0.0
@@ -46,6 +48,8 @@ class Position(Component, Vector2):
 
 
 class Vector(Component):
+    __slots__ = ("x", "y")
+
     def __init__(self):
         self.x = 0.0
         self.y = 0.0
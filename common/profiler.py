@@ -0,0 +1,40 @@
+import pygame
+from pygame.surface import Surface
+
+from ecs import Profiler
+
+
+class ProfilerOverlay:
+    """Draws frame percentiles and the slowest systems and signals of a Profiler."""
+
+    def __init__(self, profiler: Profiler, font: pygame.font.Font, rows: int = 8, color=(0, 255, 0)):
+        self.profiler = profiler
+        self.font = font
+        self.rows = rows
+        self.color = color
+        self.visible = True
+
+    def lines(self) -> list[str]:
+        report = self.profiler.report()
+        lines = [f"frame p50 {report['frame_p50'] * 1e3:6.2f}ms  p99 {report['frame_p99'] * 1e3:6.2f}ms"]
+        systems = sorted(report["systems"].items(), key=lambda item: item[1]["last"], reverse=True)
+        for name, stats in systems[:self.rows]:
+            lines.append(f"{name:28} {stats['last'] * 1e3:6.2f}ms {stats['entities']:6d}")
+        signals = sorted(report["signals"].items(), key=lambda item: item[1]["total"], reverse=True)
+        for name, stats in signals[:self.rows // 2]:
+            lines.append(f"{name:28} {stats['mean'] * 1e3:6.3f}ms x{stats['calls']}")
+        return lines
+
+    def blits(self, position: tuple[int, int] = (10, 40)) -> list[tuple[Surface, tuple[int, int]]]:
+        if not self.visible:
+            return []
+        commands = []
+        x, y = position
+        for line in self.lines():
+            label = self.font.render(line, True, self.color)
+            commands.append((label, (x, y)))
+            y += label.get_height()
+        return commands
+
+    def draw(self, surface: Surface, position: tuple[int, int] = (10, 40)):
+        surface.blits(self.blits(position), doreturn=False)
@@ -0,0 +1,121 @@
+import math
+
+import pygame
+from pygame.surface import Surface
+
+from game.constant import ScreenConstant
+
+
+def merge_rects(rects: list[pygame.Rect]) -> list[pygame.Rect]:
+    """Union overlapping rects until none of the results overlap."""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class Renderer:
+    """Batches the blits of a frame onto the canvas and pushes only the regions that changed to the screen.
+
+    Each frame the canvas is cleared where the previous frame drew, the queued blits go out in one
+    Surface.blits call, and present scales just those regions onto the screen. Overlays queued for the
+    screen, like the HUD, are blitted above it in one batch and tracked the same way. Set full_redraw to
+    clear, scale and flip the whole frame instead.
+    """
+
+    def __init__(self, canvas: Surface, screen: Surface = None, full_redraw: bool = ScreenConstant.FULL_REDRAW,
+                 background=(0, 0, 0)):
+        self.canvas = canvas
+        self.screen = screen
+        self.full_redraw = full_redraw
+        self.background = background
+        self.commands: list[tuple] = []
+        self.drawn: list[pygame.Rect] = []
+        self.dirty: list[pygame.Rect] = []
+        self.overlay_commands: list[tuple] = []
+        self.overlays: list[pygame.Rect] = []
+        self.previous_overlays: list[pygame.Rect] = []
+        self.updated: list[pygame.Rect] = []
+        self.full = True
+
+    def draw(self, surface: Surface, dest, area: pygame.Rect = None):
+        self.commands.append((surface, dest, area))
+
+    def submit(self) -> list[pygame.Rect]:
+        """Clear what the last frame drew, blit the queued commands and return the rects they cover."""
+        if self.full_redraw:
+            self.canvas.fill(self.background)
+            self.full = True
+        else:
+            for rect in self.drawn:
+                self.canvas.fill(self.background, rect)
+        drawn = self.canvas.blits(self.commands, doreturn=True)
+        self.commands.clear()
+        if self.screen is not None and not self.full:
+            self.dirty.extend(self.drawn)
+            self.dirty.extend(drawn)
+        self.drawn = drawn
+        return drawn
+
+    def get_scale(self) -> tuple[float, float]:
+        """Screen pixels per canvas pixel, horizontally and vertically."""
+        return self.screen.get_width() / self.canvas.get_width(), self.screen.get_height() / self.canvas.get_height()
+
+    def to_screen(self, rect: pygame.Rect) -> pygame.Rect:
+        scale_x, scale_y = self.get_scale()
+        left, top = math.floor(rect.left * scale_x), math.floor(rect.top * scale_y)
+        right, bottom = math.ceil(rect.right * scale_x), math.ceil(rect.bottom * scale_y)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def to_canvas(self, rect: pygame.Rect) -> pygame.Rect:
+        scale_x, scale_y = self.get_scale()
+        left, top = math.floor(rect.left / scale_x), math.floor(rect.top / scale_y)
+        right, bottom = math.ceil(rect.right / scale_x), math.ceil(rect.bottom / scale_y)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def present(self):
+        """Scale the dirty canvas regions, and those under last frame's overlays, onto the screen, then blit
+        the queued overlays above them."""
+        canvas_rect = self.canvas.get_rect()
+        rects = self.dirty + [self.to_canvas(rect) for rect in self.previous_overlays]
+        rects = [rect.clip(canvas_rect) for rect in merge_rects(rects)]
+        self.dirty.clear()
+
+        area = sum(rect.w * rect.h for rect in rects)
+        if self.full or area > canvas_rect.w * canvas_rect.h * ScreenConstant.FULL_REDRAW_RATIO:
+            pygame.transform.scale(self.canvas, self.screen.get_size(), self.screen)
+            self.updated = [self.screen.get_rect()]
+            self.full = self.full_redraw
+            self.draw_overlays()
+            return
+
+        self.updated = []
+        for rect in rects:
+            if rect.w == 0 or rect.h == 0:
+                continue
+            screen_rect = self.to_screen(rect).clip(self.screen.get_rect())
+            pygame.transform.scale(self.canvas.subsurface(rect), screen_rect.size, self.screen.subsurface(screen_rect))
+            self.updated.append(screen_rect)
+        self.draw_overlays()
+
+    def overlay(self, commands: list[tuple]):
+        """Queue (surface, dest) commands to be blitted onto the screen, above the scaled canvas."""
+        self.overlay_commands.extend(commands)
+
+    def draw_overlays(self):
+        self.overlays.extend(self.screen.blits(self.overlay_commands, doreturn=True))
+        self.overlay_commands.clear()
+
+    def update(self):
+        if self.updated and self.updated[0] == self.screen.get_rect():
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.updated + self.overlays)
+        self.previous_overlays = self.overlays
+        self.overlays = []
+        self.updated = []
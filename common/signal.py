@@ -2,6 +2,11 @@ from ecs import Signal
 
 
 class AnimationCycleCompletedSignal(Signal):
+    filters = {
+        "entity_type": lambda signal: type(signal.entity),
+        "animation": lambda signal: signal.animation.name,
+    }
+
     def __init__(self, entity, animation):
         self.entity = entity
         self.animation = animation
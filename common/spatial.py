@@ -0,0 +1,102 @@
+from ecs import System, Entity, EntityAddedSignal, EntityRemovedSignal
+from common import Position
+from game.constant import SpatialConstant
+
+
+class SpatialHashGrid:
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], dict[int, Entity]] = {}
+        self.entity_cells: dict[int, tuple[int, int]] = {}
+
+    def get_cell(self, x: float, y: float) -> tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, entity: Entity, x: float, y: float):
+        cell = self.get_cell(x, y)
+        self.cells.setdefault(cell, {})[entity.id] = entity
+        self.entity_cells[entity.id] = cell
+
+    def remove(self, entity: Entity):
+        if entity.id not in self.entity_cells:
+            return
+        cell = self.entity_cells.pop(entity.id)
+        bucket = self.cells[cell]
+        bucket.pop(entity.id)
+        if not bucket:
+            self.cells.pop(cell)
+
+    def move(self, entity: Entity, x: float, y: float):
+        cell = self.get_cell(x, y)
+        if self.entity_cells.get(entity.id) == cell:
+            return
+        self.remove(entity)
+        self.cells.setdefault(cell, {})[entity.id] = entity
+        self.entity_cells[entity.id] = cell
+
+    def clear(self):
+        self.cells.clear()
+        self.entity_cells.clear()
+
+    def candidates(self, x: float, y: float, radius: float) -> list[Entity]:
+        min_x, min_y = self.get_cell(x - radius, y - radius)
+        max_x, max_y = self.get_cell(x + radius, y + radius)
+        result = []
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if bucket:
+                    result.extend(bucket.values())
+        return result
+
+
+class SpatialIndex(System):
+    """Uniform grid over the Position centers of every entity, brought up to date once per tick.
+
+    Only entities whose Position was marked changed are moved, so systems that write Position mark it.
+    Register it before the systems that query it. Entities that move later in the same tick
+    are still found as long as they moved less than the margin since the update.
+    """
+
+    reads = (Position,)
+    writes = (SpatialHashGrid,)
+
+    def __init__(self, world, cell_size: float = SpatialConstant.CELL_SIZE, margin: float = SpatialConstant.MARGIN):
+        super().__init__(world)
+        self.grid = SpatialHashGrid(cell_size)
+        self.margin = margin
+        self.world.register_handler(EntityAddedSignal, self.on_entity_added)
+        self.world.register_handler(EntityRemovedSignal, self.on_entity_removed)
+
+    def process(self):
+        for entity in self.world.changed(Position, self):
+            self.grid.move(entity, *entity.get_component(Position).center())
+
+    def on_entity_added(self, signal: EntityAddedSignal):
+        position = signal.entity.get_component(Position)
+        if position:
+            self.grid.insert(signal.entity, *position.center())
+
+    def on_entity_removed(self, signal: EntityRemovedSignal):
+        self.grid.remove(signal.entity)
+
+    def query_radius(self, position: Position, radius: float, entity_type: type = None) -> list[Entity]:
+        """Entities whose center is closer than radius to the center of position, in id order."""
+        x, y = position.center()
+        result = []
+        for entity in self.grid.candidates(x, y, radius + self.margin):
+            if entity_type and type(entity) is not entity_type:
+                continue
+            if position.distance(entity.get_component(Position)) < radius:
+                result.append(entity)
+        result.sort(key=lambda entity: entity.id)
+        return result
+
+    def query_pairs(self, type_a: type, type_b: type, radius: float) -> list[tuple[Entity, Entity]]:
+        """Every (a, b) pair closer than radius, grouped by b in container order."""
+        pairs = []
+        for entity_b in self.world.get_entities(type_b):
+            for entity_a in self.query_radius(entity_b.get_component(Position), radius, type_a):
+                if entity_a is not entity_b:
+                    pairs.append((entity_a, entity_b))
+        return pairs
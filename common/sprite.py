@@ -5,8 +5,14 @@ from pygame.surface import Surface
 
 
 class Sprite:
-    def __init__(self, surface: Surface, rect: (float, float, float, float), offset: (float, float) = (0, 0), step=-1):
-        self.surface = surface
+    __slots__ = ("source", "area", "cropped", "x", "y", "w", "h", "offset_x", "offset_y", "step")
+
+    def __init__(self, surface: Surface, rect: (float, float, float, float), offset: (float, float) = (0, 0), step=-1,
+                 area: pygame.Rect = None):
+        # Packed sprites share an atlas page as their source and only own the area they cover on it.
+        self.source = surface
+        self.area = area
+        self.cropped = None
         self.x = rect[0]
         self.y = rect[1]
         self.w = rect[2]
@@ -15,12 +21,24 @@ class Sprite:
         self.offset_y = offset[1]
         self.step = step
 
+    @property
+    def surface(self) -> Surface:
+        if self.area is None:
+            return self.source
+        if self.cropped is None:
+            self.cropped = self.source.subsurface(self.area)
+        return self.cropped
+
 
 class SpriteSheet:
-    def __init__(self, source_filename: str, metadata_filename: str):
-        """Load the sheet."""
+    def __init__(self, source_filename: str, metadata_filename: str, atlas=None):
+        """Load the sheet. Frames already packed into the atlas are sliced from its pages instead."""
+        self.source_filename = source_filename
+        self.atlas = atlas
+        self.sheet = None
         try:
-            self.sheet = pygame.image.load(source_filename).convert()
+            if atlas is None or not atlas.has_sheet(source_filename):
+                self.sheet = pygame.image.load(source_filename).convert()
             with open(metadata_filename) as meta_file:
                 self.metadata = json.load(meta_file)
             meta_file.close()
@@ -30,6 +48,8 @@ class SpriteSheet:
 
     def image_at(self, rectangle, colorkey=None) -> Surface:
         """Load a specific image from a specific rectangle."""
+        if self.sheet is None:
+            self.sheet = pygame.image.load(self.source_filename).convert()
         # Loads image from x, y, x+offset, y+offset.
         rect = pygame.Rect(rectangle)
         image = pygame.Surface(rect.size).convert()
@@ -40,7 +60,16 @@ class SpriteSheet:
             image.set_colorkey(colorkey, pygame.RLEACCEL)
         return image
 
-    def parse_sprites(self, sprite_name) -> list[Sprite]:
+    def make_sprite(self, rect, offset=(0, 0), step=-1) -> Sprite:
+        if self.atlas is not None:
+            region = self.atlas.find(self.source_filename, rect)
+            if region is not None:
+                page, area = region
+                return Sprite(page, rect, offset, step, area)
+        return Sprite(self.image_at(rect, (255, 255, 255)), rect, offset, step)
+
+    def parse_frames(self, sprite_name) -> list[tuple[tuple, tuple, float, int]]:
+        """Rect, offset, step and duplicate count of every frame of a sprite."""
         t = self.get_metadata_or_value(["frames", sprite_name, "type"], "single")
         x = self.get_metadata(["frames", sprite_name, "x"])
         y = self.get_metadata(["frames", sprite_name, "y"])
@@ -52,33 +81,32 @@ class SpriteSheet:
         step = self.get_metadata(["frames", sprite_name, "step"])
 
         if t == "single":
-            image = self.image_at((x, y, w, h), (255, 255, 255))
-            return [Sprite(image, (x, y, w, h))]
+            return [((x, y, w, h), (0, 0), -1, 0)]
         elif t == "auto":
             count = self.get_metadata(["frames", sprite_name, "count"])
-            sprites = []
-            for i in range(0, count):
-                image = self.image_at((x, y, w, h), (255, 255, 255)).convert()
-                sprites.append(Sprite(image, (x, y, w, h)))
-                x += w
-            return sprites
+            return [((x + w * i, y, w, h), (0, 0), -1, 0) for i in range(0, count)]
         elif t == "array":
             count = self.get_metadata(["frames", sprite_name, "count"])
-            sprites = []
+            frames = []
             for i in range(0, count):
-                image = self.image_at((x[i], y[i], w[i], h[i]), (255, 255, 255))
                 ox = offset_x[i] if offset_x and len(offset_x) > i else 0
                 oy = offset_y[i] if offset_y and len(offset_y) > i else 0
                 s = step[i] if step and len(step) > i else -1
-                sprite = Sprite(image, (x[i], y[i], w[i], h[i]), (ox, oy), s)
-                sprites.append(sprite)
-                if duplicate and len(duplicate) > i:
-                    for j in range(0, duplicate[i]):
-                        sprites.append(sprite)
-            return sprites
+                d = duplicate[i] if duplicate and len(duplicate) > i else 0
+                frames.append(((x[i], y[i], w[i], h[i]), (ox, oy), s, d))
+            return frames
         else:
             return []
 
+    def parse_sprites(self, sprite_name) -> list[Sprite]:
+        sprites = []
+        for rect, offset, step, duplicate in self.parse_frames(sprite_name):
+            sprite = self.make_sprite(rect, offset, step)
+            sprites.append(sprite)
+            for j in range(0, duplicate):
+                sprites.append(sprite)
+        return sprites
+
     def parse_sprites_horizontal(self, sprite_name) -> list[Sprite]:
         x = self.get_metadata(["frames", sprite_name, "x"])
         x_m = self.get_metadata_or_value(["frames", sprite_name, "x-m"], 0)
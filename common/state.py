@@ -2,5 +2,7 @@ from ecs import Component
 
 
 class State(Component):
+    __slots__ = ("current",)
+
     def __init__(self, initial_state: str = None):
         self.current = initial_state
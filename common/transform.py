@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Optional
+
+import pygame
+from pygame.surface import Surface
+
+from common import Sprite
+from game.constant import AnimationConstant
+
+
+class TransformCache:
+    """Bounded LRU cache of flipped, scaled and rotated sprite surfaces."""
+
+    def __init__(self, budget: int = AnimationConstant.TRANSFORM_CACHE_BUDGET,
+                 rotation_step: float = AnimationConstant.ROTATION_STEP):
+        self.budget = budget
+        self.rotation_step = rotation_step
+        self.surfaces: OrderedDict[tuple, Surface] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, rotation: float) -> float:
+        if self.rotation_step <= 0:
+            return rotation
+        return round(rotation / self.rotation_step) * self.rotation_step
+
+    def get(self, sprite: Sprite, flip: bool, scale: float, mirror: bool,
+            rotation: float) -> tuple[Surface, Optional[pygame.Rect]]:
+        """Surface and blit area of the sprite flipped by its animation, scaled, then mirrored or rotated.
+
+        Untransformed sprites come back as their source with their area, so packed sprites blit straight from
+        the atlas page."""
+        rotation = 0 if mirror else self.quantize(rotation)
+        if not flip and scale == 1 and not mirror and rotation == 0:
+            return sprite.source, sprite.area
+
+        key = (sprite, flip, scale, mirror, rotation)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface, None
+
+        self.misses += 1
+        surface = self.transform(sprite.surface, flip, scale, mirror, rotation)
+        self.store(key, surface)
+        return surface, None
+
+    def prewarm(self, animations, mirror: bool = True):
+        """Build the mirrored variant of every sprite, for sheets drawn facing both ways."""
+        for animation in animations:
+            for sprite in animation.sprites:
+                key = (sprite, animation.flip, animation.scale, mirror, 0)
+                if key in self.surfaces:
+                    continue
+                self.store(key, self.transform(sprite.surface, animation.flip, animation.scale, mirror, 0))
+
+    @staticmethod
+    def transform(surface: Surface, flip: bool, scale: float, mirror: bool, rotation: float) -> Surface:
+        if flip:
+            surface = pygame.transform.flip(surface, True, False)
+        if scale != 1:
+            surface = pygame.transform.scale(surface, (surface.get_size()[0] * scale, surface.get_size()[1] * scale))
+        if mirror:
+            surface = pygame.transform.flip(surface, True, False)
+        elif rotation != 0:
+            surface = pygame.transform.rotate(surface, rotation)
+        return surface
+
+    @staticmethod
+    def get_surface_size(surface: Surface) -> int:
+        width, height = surface.get_size()
+        return width * height * surface.get_bytesize()
+
+    def store(self, key: tuple, surface: Surface):
+        self.surfaces[key] = surface
+        self.size += self.get_surface_size(surface)
+        while self.size > self.budget and len(self.surfaces) > 1:
+            _, evicted = self.surfaces.popitem(last=False)
+            self.size -= self.get_surface_size(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self.surfaces.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.surfaces),
+            "size": self.size,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,173 @@
+"""Runs one match under two configurations side by side and reports where their simulations part.
+
+    python desync.py --a objects --b columnar --ticks 3600
+    python desync.py --a scalar --b workers=4 --replay match.rpl
+
+A configuration is a comma separated list of options:
+
+    objects     components stay plain objects
+    columnar    components move into NumPy columns
+    scalar      enemies pick their targets one by one instead of vectorized
+    workers=N   systems run through the scheduler on N threads
+
+Both sides hash the simulation state after every tick. At the first tick where the hashes differ,
+the components of every entity are compared value by value.
+"""
+import argparse
+import multiprocessing
+from typing import Optional
+
+from ecs import SnapshotWriter, StateHasher
+
+
+class ValueWriter(SnapshotWriter):
+    """Collects the values a codec writes, with strings kept as they are, instead of packing them."""
+
+    def __init__(self):
+        super().__init__()
+        self.values = []
+
+    def pack(self, packer, *values):
+        self.values.extend(values)
+
+    def string(self, value: Optional[str]) -> Optional[str]:
+        return value
+
+
+def parse_configuration(configuration: str) -> dict:
+    options = {}
+    for option in filter(None, (option.strip() for option in configuration.split(","))):
+        name, _, value = option.partition("=")
+        if name not in ("objects", "columnar", "scalar", "workers"):
+            raise ValueError(f"unknown option {name}")
+        options[name] = int(value) if value else True
+    return options
+
+
+def make_runner(options: dict, seed: int, replay_path: str = None):
+    # Options that switch module globals are applied before anything is built, in the worker process.
+    from game.constant import GameConstant
+    if "objects" in options:
+        GameConstant.COLUMNAR_STORAGE = False
+    if "columnar" in options:
+        GameConstant.COLUMNAR_STORAGE = True
+    if "scalar" in options:
+        import game.system.enemy
+        game.system.enemy.np = None
+
+    from batch import BotScript
+    from game.replay import Replay
+    from headless import HeadlessRunner
+    if replay_path:
+        runner = HeadlessRunner.from_replay(Replay.load(replay_path))
+    else:
+        runner = HeadlessRunner(BotScript(seed), seed=seed)
+    if "workers" in options:
+        runner.world.enable_parallel(options["workers"])
+    return runner
+
+
+def inspect(world, hasher: StateHasher) -> dict[tuple, tuple]:
+    """Values of every hashed component, keyed by entity id, entity class and component type."""
+    values = {}
+    for entity in world.entity_container.entities.values():
+        for codec in hasher.codecs:
+            component = entity.components.get(codec.component_type)
+            if component is None:
+                continue
+            writer = ValueWriter()
+            codec.pack(writer, entity.id, component)
+            values[(entity.id, type(entity).__name__, codec.component_type.__name__)] = tuple(writer.values[1:])
+    return values
+
+
+def run_side(connection, options: dict, seed: int, replay_path: str):
+    """Worker loop: step once per request and answer with the tick hash, or with the values on request."""
+    from game.snapshot import SIMULATION_COMPONENTS
+    runner = make_runner(options, seed, replay_path)
+    hasher = runner.world.enable_hashing(*SIMULATION_COMPONENTS)
+    while True:
+        command = connection.recv()
+        if command == "step":
+            runner.step()
+            connection.send(hasher.hash)
+        elif command == "inspect":
+            connection.send(inspect(runner.world, hasher))
+        else:
+            break
+    connection.close()
+
+
+def compare(values_a: dict[tuple, tuple], values_b: dict[tuple, tuple]) -> list[tuple]:
+    """(entity id, entity class, component, value in a, value in b) of every difference, by entity id."""
+    differences = []
+    for key in sorted(values_a.keys() | values_b.keys()):
+        value_a, value_b = values_a.get(key), values_b.get(key)
+        if value_a != value_b:
+            differences.append((*key, value_a, value_b))
+    return differences
+
+
+def find_desync(configuration_a: str, configuration_b: str, ticks: int, seed: int = 0,
+                replay_path: str = None) -> Optional[tuple[int, list[tuple]]]:
+    """The first tick where the two configurations differ and the differences, or None if they never do."""
+    context = multiprocessing.get_context("fork")
+    connections = []
+    workers = []
+    for configuration in (configuration_a, configuration_b):
+        connection, worker_connection = context.Pipe()
+        worker = context.Process(target=run_side, daemon=True,
+                                 args=(worker_connection, parse_configuration(configuration), seed, replay_path))
+        worker.start()
+        worker_connection.close()
+        connections.append(connection)
+        workers.append(worker)
+
+    result = None
+    for tick in range(1, ticks + 1):
+        for connection in connections:
+            connection.send("step")
+        hash_a, hash_b = (connection.recv() for connection in connections)
+        if hash_a != hash_b:
+            for connection in connections:
+                connection.send("inspect")
+            values_a, values_b = (connection.recv() for connection in connections)
+            result = tick, compare(values_a, values_b)
+            break
+
+    for connection in connections:
+        connection.send(None)
+        connection.close()
+    for worker in workers:
+        worker.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the simulation under two configurations.")
+    parser.add_argument("--a", default="objects", help="reference configuration")
+    parser.add_argument("--b", default="columnar", help="configuration to check against it")
+    parser.add_argument("--ticks", type=int, help="ticks to compare, 3600 or the length of the replay by default")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the match the bots play")
+    parser.add_argument("--replay", help="play back a replay file instead of bots")
+    args = parser.parse_args()
+
+    ticks = args.ticks
+    if ticks is None:
+        ticks = 3600
+        if args.replay:
+            from game.replay import Replay
+            ticks = Replay.load(args.replay).ticks
+
+    result = find_desync(args.a, args.b, ticks, args.seed, args.replay)
+    if result is None:
+        print(f"'{args.a}' and '{args.b}' stayed in sync for {ticks} ticks")
+        return
+    tick, differences = result
+    print(f"'{args.a}' and '{args.b}' diverge at tick {tick}, {len(differences)} components differ")
+    for entity_id, entity_class, component, value_a, value_b in differences:
+        print(f"  entity {entity_id} ({entity_class}) {component}: {value_a} != {value_b}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,27 @@
+import random
+import struct
+import zlib
+from collections import deque
+from hashlib import blake2b
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from time import perf_counter
 from types import MethodType
-from typing import TypeVar, Type, Optional
+from typing import TypeVar, Type, Optional, Iterable
 from weakref import ref, WeakMethod
 
 
 class Component:
-    pass
+    # Components hold their data in slots: entities carry many of them and a __dict__ each adds up.
+    __slots__ = ()
 
 
 TComponent = TypeVar("TComponent", bound=Component)
 
 
 class Signal:
-    pass
+    # Values handlers can subscribe on, by name. Each function takes the signal.
+    filters = {}
 
 
 TSignal = TypeVar("TSignal", bound=Signal)
@@ -31,6 +41,8 @@ class Entity:
                 self.components[type(component)] = component
 
         self.tags = []
+        self.container = None
+        self.pool = None
 
     def get_component(self, component_type: Type[TComponent]) -> Optional[TComponent]:
         if component_type not in self.components:
@@ -41,16 +53,130 @@ class Entity:
         return component_type in self.components
 
     def add_component(self, component: Component):
-        self.components[type(component)] = component
+        component_type = type(component)
+        is_new = component_type not in self.components
+        self.components[component_type] = component
+        if self.container:
+            if is_new:
+                self.container.move_entity(self)
+            self.container.mark_changed(component_type, (self,))
+            if is_new:
+                self.container.dispatch_signal(ComponentAddedSignal(self, component_type))
 
     def remove_component(self, component_type: Type[TComponent]):
         self.components.pop(component_type)
+        if self.container:
+            self.container.move_entity(self)
+            self.container.dispatch_signal(ComponentRemovedSignal(self, component_type))
+
+    def mark_changed(self, component_type: Type[TComponent]):
+        """Flag a component as written to, for the systems that iterate World.changed."""
+        if self.container:
+            self.container.mark_changed(component_type, (self,))
 
 
 TEntity = TypeVar("TEntity", bound=Entity)
 
 
+class EntityPool:
+    """Keeps removed entities for reuse instead of building new ones.
+
+    The factory builds a fresh entity, reset prepares one for its next use with the arguments given
+    to acquire, and dispose is called for entities dropped because the pool is full.
+    """
+
+    def __init__(self, factory, reset, dispose=None, prewarm: int = 0, cap: int = None):
+        self.factory = factory
+        self.reset = reset
+        self.dispose = dispose
+        self.cap = cap
+        self.free: list[Entity] = []
+        self.created = 0
+        self.acquired = 0
+        self.reused = 0
+        self.discarded = 0
+        self.live = 0
+        self.peak_live = 0
+        for _ in range(prewarm):
+            self.free.append(self.create())
+
+    def create(self) -> Entity:
+        entity = self.factory()
+        entity.pool = self
+        self.created += 1
+        return entity
+
+    def acquire(self, *args, **kwargs) -> Entity:
+        if self.free:
+            entity = self.free.pop()
+            self.reused += 1
+        else:
+            entity = self.create()
+        self.reset(entity, *args, **kwargs)
+        self.acquired += 1
+        self.live += 1
+        self.peak_live = max(self.peak_live, self.live)
+        return entity
+
+    def release(self, entity: Entity):
+        self.live -= 1
+        if self.cap is not None and len(self.free) >= self.cap:
+            entity.pool = None
+            self.discarded += 1
+            if self.dispose:
+                self.dispose(entity)
+            return
+        self.free.append(entity)
+
+    def stats(self) -> dict:
+        return {
+            "created": self.created,
+            "acquired": self.acquired,
+            "reused": self.reused,
+            "reuse_rate": self.reused / self.acquired if self.acquired else 0.0,
+            "discarded": self.discarded,
+            "free": len(self.free),
+            "live": self.live,
+            "peak_live": self.peak_live,
+        }
+
+
+class EntityAddedSignal(Signal):
+    def __init__(self, entity: Entity):
+        self.entity = entity
+
+
+class EntityRemovedSignal(Signal):
+    def __init__(self, entity: Entity):
+        self.entity = entity
+
+
+class ComponentAddedSignal(Signal):
+    """A component type was added to an entity that is in the world."""
+
+    filters = {"component_type": lambda signal: signal.component_type}
+
+    def __init__(self, entity: Entity, component_type: Type[Component]):
+        self.entity = entity
+        self.component_type = component_type
+
+
+class ComponentRemovedSignal(Signal):
+    """A component type was removed from an entity that is in the world."""
+
+    filters = {"component_type": lambda signal: signal.component_type}
+
+    def __init__(self, entity: Entity, component_type: Type[Component]):
+        self.entity = entity
+        self.component_type = component_type
+
+
 class System:
+    # Component (or resource) types process reads and writes, including through the signals it dispatches.
+    # None leaves them undeclared: the system then never runs alongside any other.
+    reads: Optional[tuple] = None
+    writes: Optional[tuple] = None
+
     def __init__(self, world):
         self.world = world
 
@@ -61,59 +187,287 @@ class System:
 TSystem = TypeVar("TSystem", bound=System)
 
 
+class SignalHandlers:
+    """Handlers of one signal type, indexed by the filter values they subscribed with."""
+
+    def __init__(self):
+        self.groups: dict[tuple[str, ...], dict[tuple, list]] = {}
+        self.count = 0
+
+    def add(self, handler, filters: dict):
+        names = tuple(sorted(filters))
+        key = tuple(filters[name] for name in names)
+        self.groups.setdefault(names, {}).setdefault(key, []).append((self.count, handler))
+        self.count += 1
+
+    def remove(self, predicate):
+        for table in self.groups.values():
+            for key, handlers in table.items():
+                table[key] = [entry for entry in handlers if not predicate(entry[1])]
+
+    def match(self, signal: Signal) -> list:
+        matched = []
+        for names, table in self.groups.items():
+            if names:
+                key = tuple(signal.filters[name](signal) for name in names)
+            else:
+                key = ()
+            handlers = table.get(key)
+            if handlers:
+                matched.extend(handlers)
+        if len(self.groups) > 1:
+            matched.sort(key=lambda entry: entry[0])
+        return [handler for _, handler in matched]
+
+
 class SignalDispatcher:
     def __init__(self):
-        self.handlers = {}
+        self.handlers: dict[type, SignalHandlers] = {}
+        self.deferred: set[type] = set()
+        self.queue: dict[type, list[Signal]] = {}
+        self.profiler: Optional[Profiler] = None
 
     def dispatch(self, signal: Signal):
         signal_type = type(signal)
         if signal_type not in self.handlers:
             return
-        h = self.handlers[signal_type]
-        for func in h:
+        if signal_type in self.deferred:
+            self.queue.setdefault(signal_type, []).append(signal)
+            return
+        if self.profiler is None:
+            for func in self.handlers[signal_type].match(signal):
+                func()(signal)
+            return
+        start = perf_counter()
+        for func in self.handlers[signal_type].match(signal):
             func()(signal)
+        self.profiler.record_signal(signal_type, perf_counter() - start)
+
+    def defer(self, signal_type: Type[TSignal]):
+        """Queue signals of this type until the next flush instead of handling them immediately."""
+        self.deferred.add(signal_type)
+
+    def flush(self):
+        """Handle queued signals in batches per type, including signals queued while flushing."""
+        while self.queue:
+            signal_type, batch = next(iter(self.queue.items()))
+            self.queue.pop(signal_type)
+            start = perf_counter()
+            handlers = self.handlers[signal_type]
+            resolved = {}
+            for signal in batch:
+                for func in handlers.match(signal):
+                    if func not in resolved:
+                        resolved[func] = func()
+                    resolved[func](signal)
+            if self.profiler is not None:
+                self.profiler.record_signal(signal_type, perf_counter() - start)
 
-    def register_handler(self, signal_type: Type[TSignal], func):
+    def register_handler(self, signal_type: Type[TSignal], func, **filters):
+        for name in filters:
+            if name not in signal_type.filters:
+                raise ValueError(f"{signal_type.__name__} cannot be filtered by {name}")
         if signal_type not in self.handlers:
-            self.handlers[signal_type] = []
+            self.handlers[signal_type] = SignalHandlers()
         h = self.handlers[signal_type]
         if isinstance(func, MethodType):
-            h.append(WeakMethod(func, self._make_callback(signal_type)))
+            h.add(WeakMethod(func, self._make_callback(signal_type)), filters)
         else:
-            h.append(ref(func, self._make_callback(signal_type)))
+            h.add(ref(func, self._make_callback(signal_type)), filters)
 
     def unregister_handler(self, signal_type: Type[TSignal], func):
         if signal_type not in self.handlers:
-            self.handlers[signal_type] = []
-        h = self.handlers[signal_type]
-        h.remove(func)
+            return
+        self.handlers[signal_type].remove(lambda handler: handler() == func)
 
     def _make_callback(self, signal_type: Type[TSignal]):
         def callback(weak_method):
-            self.handlers[signal_type].remove(weak_method)
+            self.handlers[signal_type].remove(lambda handler: handler is weak_method)
 
         return callback
 
 
-class World:
+class ProfileStats:
     def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.entities = 0
+
+    def add(self, duration: float, entities: int = 0):
+        self.calls += 1
+        self.total += duration
+        self.last = duration
+        self.entities = entities
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total": self.total,
+            "mean": self.total / self.calls if self.calls else 0.0,
+            "last": self.last,
+            "entities": self.entities,
+        }
+
+
+class Profiler:
+    """Per-system and per-signal timings plus a rolling window of frame times.
+
+    The entity count of a system is the number of entities its queries returned during its last run.
+    """
+
+    def __init__(self, window: int = 300):
+        self.systems: dict[str, ProfileStats] = {}
+        self.signals: dict[str, ProfileStats] = {}
+        self.frame_times = deque(maxlen=window)
+        self.frames = 0
+
+    def record_system(self, system, duration: float, entities: int):
+        name = type(system).__name__
+        if name not in self.systems:
+            self.systems[name] = ProfileStats()
+        self.systems[name].add(duration, entities)
+
+    def record_signal(self, signal_type: type, duration: float):
+        name = signal_type.__name__
+        if name not in self.signals:
+            self.signals[name] = ProfileStats()
+        self.signals[name].add(duration)
+
+    def record_frame(self, duration: float):
+        self.frame_times.append(duration)
+        self.frames += 1
+
+    def percentile(self, percent: float) -> float:
+        if not self.frame_times:
+            return 0.0
+        ordered = sorted(self.frame_times)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+    def reset(self):
+        self.systems.clear()
+        self.signals.clear()
+        self.frame_times.clear()
+        self.frames = 0
+
+    def report(self) -> dict:
+        return {
+            "frames": self.frames,
+            "frame_p50": self.percentile(50),
+            "frame_p99": self.percentile(99),
+            "systems": {name: stats.as_dict() for name, stats in self.systems.items()},
+            "signals": {name: stats.as_dict() for name, stats in self.signals.items()},
+        }
+
+
+class SimulationClock:
+    """Fixed-step clock. Systems running during tick n see time n * dt."""
+
+    def __init__(self, dt: float = 1 / 60):
+        self.dt = dt
+        self.tick = 0
+
+    @property
+    def time(self) -> float:
+        return self.tick * self.dt
+
+    def advance(self):
+        self.tick += 1
+
+
+class World:
+    def __init__(self, dt: float = 1 / 60, seed: int = None):
         self.current_id = 0
-        self.entity_container: EntityContainer = EntityContainer()
-        self.system_container = SystemContainer()
         self.signal_dispatcher = SignalDispatcher()
+        self.entity_container: EntityContainer = EntityContainer(self.signal_dispatcher)
+        self.system_container = SystemContainer()
+        self.clock = SimulationClock(dt)
+        self.profiler: Optional[Profiler] = None
+        self.scheduler: Optional[SystemScheduler] = None
+        self.hasher: Optional[StateHasher] = None
+        # Source of randomness for the simulation. Unseeded worlds share the global random module.
+        self.seed = seed
+        self.random = random.Random(seed) if seed is not None else random
 
     def process(self):
-        for system in self.system_container.systems:
-            system.process()
+        if self.scheduler is not None:
+            self.scheduler.process(self.system_container.systems, self.signal_dispatcher, self.profiler)
+        elif self.profiler is None:
+            dispatcher = self.signal_dispatcher
+            for system in self.system_container.systems:
+                system.process()
+                # Every system boundary is a sync point for deferred signals.
+                if dispatcher.queue:
+                    dispatcher.flush()
+        else:
+            self.system_container.process_profiled(self.profiler, self.entity_container, self.signal_dispatcher)
+        self.clock.advance()
+        if self.hasher is not None:
+            self.hasher.update(self)
+
+    def enable_profiling(self, window: int = 300) -> Profiler:
+        self.profiler = Profiler(window)
+        self.signal_dispatcher.profiler = self.profiler
+        return self.profiler
+
+    def disable_profiling(self):
+        self.profiler = None
+        self.signal_dispatcher.profiler = None
+
+    def enable_parallel(self, workers: int = None) -> "SystemScheduler":
+        """Run systems through a SystemScheduler; with workers set to 0 they keep running one at a time.
+
+        Opt-in and currently slower than the default loop, see SystemScheduler.
+        """
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        self.scheduler = SystemScheduler(workers)
+        return self.scheduler
+
+    def disable_parallel(self):
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        self.scheduler = None
+
+    def enable_hashing(self, *component_types: Type[Component], history: Optional[int] = 0) -> "StateHasher":
+        """Hash the given components of every entity after each tick, keeping the last history tick hashes:
+        none by default, all of them with None."""
+        self.disable_hashing()
+        self.hasher = StateHasher(self, component_types, history=history)
+        return self.hasher
+
+    def disable_hashing(self):
+        if self.hasher is not None:
+            self.entity_container.forget_reader(self.hasher)
+        self.hasher = None
 
     def get_entities(self, entity_type: Type[TEntity] = None) -> list[TEntity]:
         return self.entity_container.get_entities(entity_type)
 
+    def query(self, *component_types: Type[Component]) -> list[Entity]:
+        return self.entity_container.query(*component_types)
+
+    def mark_changed(self, component_type: Type[Component], entities: Iterable[Entity]):
+        self.entity_container.mark_changed(component_type, entities)
+
+    def changed(self, component_type: Type[Component], reader) -> list[Entity]:
+        """Entities whose component_type was marked changed, or that were added with it, since reader last asked.
+
+        The first call returns every entity with the component. Code that writes to a component read this
+        way marks it with Entity.mark_changed or World.mark_changed.
+        """
+        return self.entity_container.changed(component_type, reader)
+
     def add_entity(self, entity: Entity):
         self.entity_container.add_entity(entity)
+        self.signal_dispatcher.dispatch(EntityAddedSignal(entity))
 
     def remove_entity(self, entity: Entity):
         self.entity_container.remove_entity(entity)
+        self.signal_dispatcher.dispatch(EntityRemovedSignal(entity))
+        if entity.pool:
+            entity.pool.release(entity)
 
     def get_system(self, system_type: Type[TSystem]) -> TSystem:
         return self.system_container.get_system(system_type)
@@ -124,8 +478,8 @@ class World:
     def dispatch_signal(self, signal: Signal):
         self.signal_dispatcher.dispatch(signal)
 
-    def register_handler(self, signal_type: Type[TSignal], func):
-        self.signal_dispatcher.register_handler(signal_type, func)
+    def register_handler(self, signal_type: Type[TSignal], func, **filters):
+        self.signal_dispatcher.register_handler(signal_type, func, **filters)
 
     def unregister_handler(self, signal_type: Type[TSignal], func):
         self.signal_dispatcher.unregister_handler(signal_type, func)
@@ -134,40 +488,267 @@ class World:
         self.current_id += 1
         return self.current_id
 
+    def snapshot(self, registry: "SnapshotRegistry" = None) -> bytes:
+        """Entity ids, component data, clock and random state packed into a buffer for restore.
+
+        Shared assets stay out of it: restored entities are built by their class's factory and only
+        the components with a codec are overwritten.
+        """
+        registry = registry if registry is not None else snapshot_registry
+        writer = SnapshotWriter()
+        entities = list(self.entity_container.entities.values())
+        for entity in entities:
+            writer.pack(SNAPSHOT_ENTITY, entity.id, registry.get_entity_tag(type(entity)))
+
+        block_count = 0
+        for codec_tag, codec in enumerate(registry.codecs):
+            component_type = codec.component_type
+            records = [(entity.id, entity.components[component_type]) for entity in entities
+                       if component_type in entity.components]
+            if not records:
+                continue
+            block_count += 1
+            writer.pack(SNAPSHOT_BLOCK, codec_tag, len(records))
+            for entity_id, component in records:
+                codec.pack(writer, entity_id, component)
+
+        random_state = None
+        if hasattr(self.random, "getstate"):
+            random_state = self.random.getstate()
+        return writer.getvalue(self.clock.tick, self.entity_container.current_id, len(entities), block_count,
+                               random_state)
+
+    def restore(self, data: bytes, registry: "SnapshotRegistry" = None):
+        """Bring the world back to a snapshot. Entities missing from it are removed, those missing from
+        the world are rebuilt under their old ids, and the others are updated in place."""
+        registry = registry if registry is not None else snapshot_registry
+        reader = SnapshotReader(data)
+        tick, current_id, entity_count, block_count, random_state = reader.read_header()
+
+        container = self.entity_container
+        classes = {}
+        for _ in range(entity_count):
+            entity_id, entity_tag = reader.unpack(SNAPSHOT_ENTITY)
+            classes[entity_id] = registry.entity_classes[entity_tag]
+        for entity in list(container.entities.values()):
+            if classes.get(entity.id) is not type(entity):
+                self.remove_entity(entity)
+
+        created = {}
+        for entity_id, entity_class in classes.items():
+            if entity_id not in container.entities:
+                created[entity_id] = registry.factories[registry.entity_tags[entity_class]](self)
+        entities = reader.entities = {**container.entities, **created}
+
+        restored = {entity_id: set() for entity_id in classes}
+        for _ in range(block_count):
+            codec_tag, count = reader.unpack(SNAPSHOT_BLOCK)
+            codec = registry.codecs[codec_tag]
+            component_type = codec.component_type
+            fixed = codec.record is not None
+            if fixed:
+                # Fixed size records are unpacked in one pass over the block.
+                size = codec.record.size * count
+                records = codec.record.iter_unpack(reader.data[reader.position:reader.position + size])
+                reader.position += size
+            else:
+                records = (reader.unpack(SNAPSHOT_ID) for _ in range(count))
+            block_entities = []
+            for entity_id, *values in records:
+                entity = entities[entity_id]
+                block_entities.append(entity)
+                component = entity.components.get(component_type)
+                if component is None:
+                    component = codec.make()
+                    entity.add_component(component)
+                if fixed:
+                    codec.set_values(reader, component, values)
+                else:
+                    codec.read(reader, component)
+                restored[entity_id].add(component_type)
+            container.mark_changed(component_type, block_entities)
+        for entity_id, component_types in restored.items():
+            entity = entities[entity_id]
+            for component_type in list(entity.components):
+                if component_type in registry.codec_tags and component_type not in component_types:
+                    entity.remove_component(component_type)
+
+        for entity_id, entity in created.items():
+            container.add_entity(entity, entity_id)
+            self.signal_dispatcher.dispatch(EntityAddedSignal(entity))
+        container.sort()
+        container.current_id = current_id
+        self.clock.tick = tick
+        # Last, since factories may draw from the world's random.
+        if random_state is not None and hasattr(self.random, "setstate"):
+            self.random.setstate(random_state)
+
+
+class Archetype:
+    def __init__(self, signature: frozenset):
+        self.signature = signature
+        self.entities = {}
+
 
 class EntityContainer:
-    def __init__(self):
+    def __init__(self, signal_dispatcher: "SignalDispatcher" = None):
         self.current_id = 0
+        # Where component added and removed signals go.
+        self.signal_dispatcher = signal_dispatcher
         self.entities = {}
+        # Entities are grouped by the set of component types they carry, so a query only
+        # visits the archetypes that match it instead of every entity.
+        self.archetypes: dict[frozenset, Archetype] = {}
+        self.entity_archetypes: dict[int, Archetype] = {}
+        self.queries: dict[frozenset, list[Archetype]] = {}
+        self.entities_by_class: dict[type, dict[int, Entity]] = {}
+        self.entities_by_type_name: dict[str, dict[int, Entity]] = {}
+        # Number of entities handed out by lookups, used to attribute entity counts to systems.
+        self.visited = 0
+        # Change tracking, for the component types some reader asked World.changed about: the version each
+        # entity's component was last marked at, oldest first, and the version each reader has seen.
+        self.changes: dict[type, dict[int, int]] = {}
+        self.change_versions: dict[type, int] = {}
+        self.change_readers: dict[type, dict[object, int]] = {}
 
     def get_entities(self, entity_type: Type[TEntity] = None) -> list[TEntity]:
         if not entity_type:
-            return list(self.entities.values())
-        filtered = filter(lambda entity: type(entity) is entity_type, self.entities.values())
-        return list(filtered)
+            entities = list(self.entities.values())
+        elif entity_type not in self.entities_by_class:
+            return []
+        else:
+            entities = list(self.entities_by_class[entity_type].values())
+        self.visited += len(entities)
+        return entities
 
-    def add_entity(self, entity: Entity):
-        entity.id = self.get_next_id()
+    def add_entity(self, entity: Entity, entity_id: int = None):
+        entity.id = entity_id if entity_id is not None else self.get_next_id()
+        entity.container = self
         self.entities[entity.id] = entity
+        self.entities_by_class.setdefault(type(entity), {})[entity.id] = entity
+        self.entities_by_type_name.setdefault(entity.entity_type, {})[entity.id] = entity
+        archetype = self.get_archetype(frozenset(entity.components))
+        archetype.entities[entity.id] = entity
+        self.entity_archetypes[entity.id] = archetype
+        if self.changes:
+            for component_type in self.changes.keys() & entity.components.keys():
+                self.mark_changed(component_type, (entity,))
 
     def remove_entity(self, entity: Entity):
         self.entities.pop(entity.id)
+        self.entities_by_class[type(entity)].pop(entity.id)
+        self.entities_by_type_name[entity.entity_type].pop(entity.id)
+        archetype = self.entity_archetypes.pop(entity.id)
+        archetype.entities.pop(entity.id)
+        entity.container = None
+
+    def move_entity(self, entity: Entity):
+        previous = self.entity_archetypes[entity.id]
+        signature = frozenset(entity.components)
+        if previous.signature == signature:
+            return
+        previous.entities.pop(entity.id)
+        archetype = self.get_archetype(signature)
+        archetype.entities[entity.id] = entity
+        self.entity_archetypes[entity.id] = archetype
+
+    def dispatch_signal(self, signal: Signal):
+        if self.signal_dispatcher is not None:
+            self.signal_dispatcher.dispatch(signal)
+
+    def get_archetype(self, signature: frozenset) -> Archetype:
+        if signature in self.archetypes:
+            return self.archetypes[signature]
+        archetype = Archetype(signature)
+        self.archetypes[signature] = archetype
+        for query, archetypes in self.queries.items():
+            if query <= signature:
+                archetypes.append(archetype)
+        return archetype
+
+    def query(self, *component_types: Type[Component]) -> list[Entity]:
+        key = frozenset(component_types)
+        if key not in self.queries:
+            self.queries[key] = [archetype for archetype in self.archetypes.values() if key <= archetype.signature]
+        result = []
+        for archetype in self.queries[key]:
+            result.extend(archetype.entities.values())
+        self.visited += len(result)
+        return result
+
+    def mark_changed(self, component_type: Type[Component], entities: Iterable[Entity]):
+        changes = self.changes.get(component_type)
+        if changes is None:
+            return
+        version = self.change_versions[component_type] + 1
+        self.change_versions[component_type] = version
+        for entity in entities:
+            # Moved to the end, so the dict stays ordered by version.
+            changes.pop(entity.id, None)
+            changes[entity.id] = version
+
+    def forget_reader(self, reader):
+        """Stop keeping changes for a reader of World.changed, and stop tracking types nobody reads."""
+        for component_type, readers in list(self.change_readers.items()):
+            readers.pop(reader, None)
+            if not readers:
+                del self.change_readers[component_type]
+                del self.changes[component_type]
+                del self.change_versions[component_type]
+
+    def changed(self, component_type: Type[Component], reader) -> list[Entity]:
+        if component_type not in self.changes:
+            self.changes[component_type] = {}
+            self.change_versions[component_type] = 0
+            self.change_readers[component_type] = {}
+        changes = self.changes[component_type]
+        readers = self.change_readers[component_type]
+        seen = readers.get(reader)
+        readers[reader] = self.change_versions[component_type]
+
+        if seen is None:
+            return self.query(component_type)
+        entity_ids = []
+        for entity_id, version in reversed(changes.items()):
+            if version <= seen:
+                break
+            entity_ids.append(entity_id)
+        # Entities removed since, or that lost the component, are skipped.
+        entities = self.entities
+        result = [entities[entity_id] for entity_id in reversed(entity_ids)
+                  if entity_id in entities and component_type in entities[entity_id].components]
+        self.visited += len(result)
+
+        # Changes every reader has seen are dropped.
+        oldest = min(readers.values())
+        if changes and next(iter(changes.values())) <= oldest:
+            self.changes[component_type] = {entity_id: version for entity_id, version in changes.items()
+                                            if version > oldest}
+        return result
 
     def get_entity_of_type(self, entity_type: str) -> list[Entity]:
-        filtered = filter(lambda entity: entity.entity_type == entity_type, self.entities.values())
-        return list(filtered)
+        if entity_type not in self.entities_by_type_name:
+            return []
+        entities = list(self.entities_by_type_name[entity_type].values())
+        self.visited += len(entities)
+        return entities
 
     def get_entities_with_component(self, component_type: Type[TComponent]) -> list[Entity]:
-        filtered = filter(
-            lambda entity: any(type(component) is component_type for component in entity.components.values()),
-            self.entities.values())
-
-        return list(filtered)
+        return self.query(component_type)
 
     def get_next_id(self):
         self.current_id += 1
         return self.current_id
 
+    def sort(self):
+        """Put every lookup back in id order, the order entities are normally added in."""
+        lookups = [self.entities, *self.entities_by_class.values(), *self.entities_by_type_name.values()]
+        lookups.extend(archetype.entities for archetype in self.archetypes.values())
+        for entities in lookups:
+            ordered = sorted(entities.items())
+            entities.clear()
+            entities.update(ordered)
+
 
 class SystemContainer:
     def __init__(self):
@@ -181,3 +762,377 @@ class SystemContainer:
 
     def add_system(self, system: System):
         self.systems.append(system)
+
+    def process_profiled(self, profiler: Profiler, entity_container: EntityContainer,
+                         signal_dispatcher: SignalDispatcher):
+        frame_start = perf_counter()
+        for system in self.systems:
+            visited = entity_container.visited
+            start = perf_counter()
+            system.process()
+            profiler.record_system(system, perf_counter() - start, entity_container.visited - visited)
+            if signal_dispatcher.queue:
+                signal_dispatcher.flush()
+        profiler.record_frame(perf_counter() - frame_start)
+
+
+class SystemScheduler:
+    """Runs systems that touch disjoint components concurrently on a thread pool.
+
+    A system depends on every earlier system it conflicts with: one writes a type the other reads or
+    writes, or either has not declared its reads and writes. Systems are grouped into waves, each only
+    depending on earlier waves; the systems of a wave run together and deferred signals are flushed
+    between waves. Without workers every system runs alone in registration order, as in World.process.
+
+    It is opt-in and, with the declarations the game has today, slower than World.process: the largest
+    systems are undeclared, so nearly every wave holds a single system, and threads only gain anything
+    for systems that spend their time outside the GIL, in NumPy for instance. Use report() to check the
+    waves and parallelism before enabling it for speed.
+    """
+
+    def __init__(self, workers: int = None):
+        self.executor = ThreadPoolExecutor(workers) if workers != 0 else None
+        self.systems: list[System] = []
+        self.dependencies: list[list[int]] = []
+        self.waves: list[list[int]] = []
+        self.durations: list[float] = []
+        # Longest chain of dependent systems in the last frame, against the time running them one by one.
+        self.critical_path = 0.0
+        self.serial_time = 0.0
+
+    @staticmethod
+    def conflicts(first: System, second: System) -> bool:
+        if first.reads is None or first.writes is None or second.reads is None or second.writes is None:
+            return True
+        first_writes = set(first.writes)
+        second_writes = set(second.writes)
+        return bool(first_writes & (second_writes | set(second.reads)) or second_writes & set(first.reads))
+
+    def build(self, systems: list[System]):
+        self.systems = list(systems)
+        self.dependencies = [[earlier for earlier in range(index) if self.conflicts(systems[earlier], system)]
+                             for index, system in enumerate(systems)]
+        levels = []
+        for dependencies in self.dependencies:
+            levels.append(max((levels[earlier] + 1 for earlier in dependencies), default=0))
+        self.waves = [[] for _ in range(max(levels, default=-1) + 1)]
+        for index, level in enumerate(levels):
+            self.waves[level].append(index)
+        self.durations = [0.0] * len(systems)
+
+    def run(self, index: int):
+        start = perf_counter()
+        self.systems[index].process()
+        self.durations[index] = perf_counter() - start
+
+    def process(self, systems: list[System], dispatcher: SignalDispatcher, profiler: Profiler = None):
+        if systems != self.systems:
+            self.build(systems)
+        frame_start = perf_counter()
+        if self.executor is None:
+            for index in range(len(self.systems)):
+                self.run(index)
+                if dispatcher.queue:
+                    dispatcher.flush()
+        else:
+            for wave in self.waves:
+                if len(wave) == 1:
+                    self.run(wave[0])
+                else:
+                    for future in [self.executor.submit(self.run, index) for index in wave]:
+                        future.result()
+                if dispatcher.queue:
+                    dispatcher.flush()
+
+        finish = []
+        for index, dependencies in enumerate(self.dependencies):
+            finish.append(self.durations[index] + max((finish[earlier] for earlier in dependencies), default=0.0))
+        self.critical_path = max(finish, default=0.0)
+        self.serial_time = sum(self.durations)
+        if profiler is not None:
+            for system, duration in zip(self.systems, self.durations):
+                profiler.record_system(system, duration, 0)
+            profiler.record_frame(perf_counter() - frame_start)
+
+    def report(self) -> dict:
+        return {
+            "waves": [[type(self.systems[index]).__name__ for index in wave] for wave in self.waves],
+            "critical_path": self.critical_path,
+            "serial_time": self.serial_time,
+            "parallelism": self.serial_time / self.critical_path if self.critical_path else 1.0,
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+SNAPSHOT_MAGIC = b"WSNP"
+SNAPSHOT_VERSION = 1
+# Header: magic, version, tick, next entity id, entity count, component block count, string count.
+SNAPSHOT_HEADER = struct.Struct("<4sHQIIHI")
+SNAPSHOT_STRING = struct.Struct("<H")
+# Random state: whether there is one, its version, the Mersenne Twister words and position, the cached gauss.
+SNAPSHOT_RANDOM = struct.Struct("<?I625I?d")
+SNAPSHOT_ENTITY = struct.Struct("<IH")
+SNAPSHOT_BLOCK = struct.Struct("<HI")
+SNAPSHOT_ID = struct.Struct("<I")
+NO_STRING = 0xFFFF
+
+
+class SnapshotWriter:
+    """Buffer a snapshot is packed into. Strings are stored once in a table and written as indices."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.strings: dict[str, int] = {}
+
+    def pack(self, packer: struct.Struct, *values):
+        self.buffer += packer.pack(*values)
+
+    def string(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    @staticmethod
+    def entity(entity: Optional[Entity]) -> int:
+        return entity.id if entity is not None else 0
+
+    def getvalue(self, tick: int, current_id: int, entity_count: int, block_count: int, random_state) -> bytes:
+        data = bytearray(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, tick, current_id, entity_count,
+                                              block_count, len(self.strings)))
+        if random_state is None:
+            data += SNAPSHOT_RANDOM.pack(False, 0, *([0] * 625), False, 0.0)
+        else:
+            version, words, gauss = random_state
+            data += SNAPSHOT_RANDOM.pack(True, version, *words, gauss is not None, gauss or 0.0)
+        for value in self.strings:
+            encoded = value.encode()
+            data += SNAPSHOT_STRING.pack(len(encoded))
+            data += encoded
+        data += self.buffer
+        return bytes(data)
+
+
+class SnapshotReader:
+    """Reads a snapshot back in the order SnapshotWriter packed it."""
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.position = 0
+        self.strings: list[str] = []
+        # Every entity of the snapshot by id, once they all exist, so references can be resolved.
+        self.entities: dict[int, Entity] = {}
+
+    def unpack(self, packer: struct.Struct) -> tuple:
+        values = packer.unpack_from(self.data, self.position)
+        self.position += packer.size
+        return values
+
+    def string(self, index: int) -> Optional[str]:
+        return self.strings[index] if index != NO_STRING else None
+
+    def entity(self, entity_id: int) -> Optional[Entity]:
+        return self.entities.get(entity_id)
+
+    def read_header(self) -> tuple:
+        magic, version, tick, current_id, entity_count, block_count, string_count = self.unpack(SNAPSHOT_HEADER)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("not a world snapshot of this version")
+        has_random, random_version, *words, has_gauss, gauss = self.unpack(SNAPSHOT_RANDOM)
+        random_state = (random_version, tuple(words), gauss if has_gauss else None) if has_random else None
+        for _ in range(string_count):
+            length, = self.unpack(SNAPSHOT_STRING)
+            self.strings.append(bytes(self.data[self.position:self.position + length]).decode())
+            self.position += length
+        return tick, current_id, entity_count, block_count, random_state
+
+
+class ComponentCodec:
+    """Writes the simulation data of one component type into a snapshot and reads it back.
+
+    Codecs with a struct format store fixed size values through get_values and set_values; set the
+    format to None and override write and read for variable sized data. The base class stores
+    nothing, which is enough for marker components.
+    """
+
+    format: Optional[str] = ""
+
+    def __init__(self, component_type: Type[Component], fmt: str = None):
+        self.component_type = component_type
+        if fmt is not None:
+            self.format = fmt
+        # Entity id followed by the values.
+        self.record = struct.Struct("<I" + self.format) if self.format is not None else None
+
+    def make(self) -> Component:
+        return self.component_type()
+
+    def pack(self, writer: SnapshotWriter, entity_id: int, component: Component):
+        """Write one record: the entity id, then the component's data."""
+        if self.record is not None:
+            writer.pack(self.record, entity_id, *self.get_values(writer, component))
+            return
+        writer.pack(SNAPSHOT_ID, entity_id)
+        self.write(writer, component)
+
+    def get_values(self, writer: SnapshotWriter, component: Component) -> tuple:
+        return ()
+
+    def set_values(self, reader: SnapshotReader, component: Component, values: list):
+        pass
+
+    def write(self, writer: SnapshotWriter, component: Component):
+        pass
+
+    def read(self, reader: SnapshotReader, component: Component):
+        pass
+
+
+class StructCodec(ComponentCodec):
+    """Stores attributes of a component, one struct format character each."""
+
+    def __init__(self, component_type: Type[Component], fmt: str, *attributes: str):
+        super().__init__(component_type, fmt)
+        self.attributes = attributes
+        self.getter = attrgetter(*attributes)
+
+    def get_values(self, writer: SnapshotWriter, component: Component) -> tuple:
+        values = self.getter(component)
+        return values if len(self.attributes) > 1 else (values,)
+
+    def set_values(self, reader: SnapshotReader, component: Component, values: list):
+        for attribute, value in zip(self.attributes, values):
+            setattr(component, attribute, value)
+
+
+class SnapshotRegistry:
+    """Codecs of the component types and factories of the entity classes snapshots can hold.
+
+    Both are written by tag, their registration order, so every process has to register them alike.
+    A factory takes the world and returns an entity ready for its components to be overwritten.
+    """
+
+    def __init__(self):
+        self.codecs: list[ComponentCodec] = []
+        self.codec_tags: dict[type, int] = {}
+        self.entity_classes: list[type] = []
+        self.factories: list = []
+        self.entity_tags: dict[type, int] = {}
+
+    def register_codec(self, codec: ComponentCodec):
+        if codec.component_type in self.codec_tags:
+            self.codecs[self.codec_tags[codec.component_type]] = codec
+            return
+        self.codec_tags[codec.component_type] = len(self.codecs)
+        self.codecs.append(codec)
+
+    def register_entity(self, entity_class: Type[Entity], factory):
+        if entity_class in self.entity_tags:
+            self.factories[self.entity_tags[entity_class]] = factory
+            return
+        self.entity_tags[entity_class] = len(self.entity_classes)
+        self.entity_classes.append(entity_class)
+        self.factories.append(factory)
+
+    def get_entity_tag(self, entity_class: type) -> int:
+        if entity_class not in self.entity_tags:
+            raise ValueError(f"{entity_class.__name__} has no snapshot factory")
+        return self.entity_tags[entity_class]
+
+
+snapshot_registry = SnapshotRegistry()
+
+
+class HashWriter(SnapshotWriter):
+    """Packs records like a snapshot, but with strings hashed in place, so the bytes only depend on the values."""
+
+    def string(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        return zlib.crc32(value.encode()) % NO_STRING
+
+
+class StateHasher:
+    """Hash of the simulation state after every tick, and a hash chained over all of them.
+
+    The tracked components of each entity are packed with their snapshot codecs and digested on their
+    own. The tick hash sums those digests, so it does not depend on the order entities are visited in,
+    while the chain tells whether two runs ever differed.
+
+    The sum is kept up to date: each tick only the entities added or removed, or whose tracked components
+    World.changed reports, are digested again. Code that writes to a tracked component marks it changed.
+    """
+
+    def __init__(self, world: World, component_types: tuple, registry: SnapshotRegistry = None,
+                 history: Optional[int] = 0):
+        registry = registry if registry is not None else snapshot_registry
+        self.component_types = component_types
+        self.codecs = [registry.codecs[registry.codec_tags[component_type]] for component_type in component_types]
+        self.writer = HashWriter()
+        self.tick = 0
+        self.hash = 0
+        self.chain = 0
+        self.history = deque(maxlen=history)
+        self.digests: dict[int, int] = {}
+        self.total = 0
+        self.dirty: set[Entity] = set()
+
+        container = world.entity_container
+        for component_type in component_types:
+            # Starts tracking the type; every entity is digested below anyway.
+            container.changed(component_type, self)
+        for entity in container.entities.values():
+            self.digests[entity.id] = self.digest(entity)
+        self.total = sum(self.digests.values())
+        world.register_handler(EntityAddedSignal, self.on_entity_added)
+        world.register_handler(EntityRemovedSignal, self.on_entity_removed)
+        for component_type in component_types:
+            world.register_handler(ComponentRemovedSignal, self.on_component_removed, component_type=component_type)
+
+    def on_entity_added(self, signal: EntityAddedSignal):
+        self.dirty.add(signal.entity)
+
+    def on_entity_removed(self, signal: EntityRemovedSignal):
+        self.dirty.discard(signal.entity)
+        self.total -= self.digests.pop(signal.entity.id, 0)
+
+    def on_component_removed(self, signal: ComponentRemovedSignal):
+        self.dirty.add(signal.entity)
+
+    def digest(self, entity: Entity) -> int:
+        writer = self.writer
+        writer.buffer.clear()
+        writer.pack(SNAPSHOT_ID, entity.id)
+        components = entity.components
+        for codec in self.codecs:
+            component = components.get(codec.component_type)
+            if component is not None:
+                codec.pack(writer, entity.id, component)
+        return int.from_bytes(blake2b(writer.buffer, digest_size=8).digest(), "little")
+
+    def update(self, world: World) -> int:
+        self.tick = world.clock.tick
+        container = world.entity_container
+        dirty = self.dirty
+        for component_type in self.component_types:
+            dirty.update(container.changed(component_type, self))
+        entities = container.entities
+        digests = self.digests
+        for entity in dirty:
+            if entities.get(entity.id) is not entity:
+                continue
+            digest = self.digest(entity)
+            self.total += digest - digests.get(entity.id, 0)
+            digests[entity.id] = digest
+        dirty.clear()
+        self.hash = self.total & 0xFFFFFFFFFFFFFFFF
+        chain = blake2b(struct.pack("<QQ", self.chain, self.hash), digest_size=8)
+        self.chain = int.from_bytes(chain.digest(), "little")
+        self.history.append((self.tick, self.hash))
+        return self.hash
@@ -0,0 +1,128 @@
+import pygame
+
+from ecs import World
+from game.component import PlayerKeyBindings, Passable, Invincible, Joined, Score
+from game.entity import Player, Enemy, get_asset_manifest
+from common import AnimationPlayer, EventQueue, SpatialIndex, KeyboardState, AnimationCycleCompletedSignal, \
+    animation_cache, animation_loader, use_atlas, use_bundles, TextureAtlas, Renderer, AnimationLoader
+from game.system import PlayerInputSystem, GameSystem, PlayerAttackSystem, DeadEntitySystem, BulletMovementSystem, \
+    BulletCollisionSystem, EntityCooldownSystem, \
+    PlayerCollisionSystem, BulletRotationSystem, PlayerJoinSystem, EnemySpawnSystem, ColumnarStorage, HudSystem, \
+    TextWidget
+from game.system.enemy import EnemySelectTargetSystem, EnemyVelocitySystem, EnemyPositionSystem, EnemyAttackSystem
+from game.constant import GameConstant, AssetConstant, ScreenConstant, HudConstant
+from game.snapshot import register_snapshot_types
+from game.system.transition import HurtTransitionSystem, BulletTransitionSystem, PlayerTransitionSystem, \
+    EnemyTransitionSystem
+
+
+def preload_assets(mode: str = AssetConstant.LOAD_MODE, background: bool = False):
+    """Load the animations of every entity class up front from precompiled bundles, a texture atlas or the
+    sheets themselves. In the background, entities created before their animations are ready get placeholders."""
+    assets = get_asset_manifest()
+    if mode == "bundle":
+        use_bundles()
+    elif mode == "atlas":
+        use_atlas(TextureAtlas.build(*assets))
+    else:
+        use_atlas(None)
+
+    if background:
+        for paths in assets:
+            animation_loader.request(*paths)
+    else:
+        animation_cache.preload(*assets)
+
+
+def add_systems(world: World, renderer: Renderer = None, input_source=None):
+    """Register the game systems in their update order. Without a renderer nothing is drawn."""
+    register_snapshot_types()
+    world.signal_dispatcher.defer(AnimationCycleCompletedSignal)
+
+    world.add_system(AnimationLoader(world))
+    if GameConstant.COLUMNAR_STORAGE:
+        world.add_system(ColumnarStorage(world))
+    world.add_system(SpatialIndex(world))
+    world.add_system(KeyboardState(world, input_source))
+    world.add_system(PlayerInputSystem(world))
+
+    world.add_system(BulletRotationSystem(world))
+
+    world.add_system(PlayerAttackSystem(world))
+    world.add_system(PlayerCollisionSystem(world))
+    world.add_system(HurtTransitionSystem(world))
+    world.add_system(PlayerTransitionSystem(world))
+    world.add_system(PlayerJoinSystem(world))
+
+    world.add_system(DeadEntitySystem(world))
+    world.add_system(BulletMovementSystem(world))
+    world.add_system(BulletCollisionSystem(world))
+    world.add_system(BulletTransitionSystem(world))
+
+    world.add_system(EnemySelectTargetSystem(world))
+    world.add_system(EnemyVelocitySystem(world))
+    world.add_system(EnemyPositionSystem(world))
+    world.add_system(EnemyAttackSystem(world))
+    world.add_system(EnemyTransitionSystem(world))
+
+    world.add_system(EventQueue(world))
+    world.add_system(GameSystem(world))
+    world.add_system(EntityCooldownSystem(world))
+    animation_player = AnimationPlayer(world, renderer)
+    if renderer is not None:
+        def prewarm(key: tuple):
+            animation_player.transform_cache.prewarm(animation_cache.get(*key).values())
+
+        # Mirrored sprites are built as soon as their animations are loaded, in the background or not.
+        for paths in (AssetConstant.PLAYER, AssetConstant.ENEMY):
+            if animation_loader.is_pending(*paths):
+                animation_loader.request(*paths, callback=prewarm)
+            else:
+                prewarm(animation_cache.make_key(*paths))
+    world.add_system(animation_player)
+    world.add_system(EnemySpawnSystem(world))
+
+
+def add_entities(world: World) -> tuple[Player, Player]:
+    player = Player()
+    player.add_component(PlayerKeyBindings({
+        "UP": pygame.K_w,
+        "DOWN": pygame.K_s,
+        "LEFT": pygame.K_a,
+        "RIGHT": pygame.K_d,
+        "ATTACK": pygame.K_f,
+    }))
+    player.add_component(Joined())
+
+    player2 = Player("waiting", "waiting")
+    player2.add_component(PlayerKeyBindings({
+        "UP": pygame.K_UP,
+        "DOWN": pygame.K_DOWN,
+        "LEFT": pygame.K_LEFT,
+        "RIGHT": pygame.K_RIGHT,
+        "ATTACK": pygame.K_j,
+    }))
+    player2.add_component(Passable())
+    player2.add_component(Invincible())
+
+    world.add_entity(player)
+    world.add_entity(player2)
+
+    world.add_entity(Enemy(world.random))
+    world.add_entity(Enemy(world.random))
+    world.add_entity(Enemy(world.random))
+
+    return player, player2
+
+
+def add_hud(world: World, renderer: Renderer, player: Player, player2: Player) -> HudSystem:
+    """Scores of both players, and name tags over them once the second player has joined."""
+    hud = HudSystem(world, renderer)
+    hud.add_widget(TextWidget(player, "Score P1: {}", (10, 10), HudConstant.SCORE_COLOR, Score, "score"))
+    hud.add_widget(TextWidget(player2, "Score P2: {}", (ScreenConstant.WIDTH - 200, 10), HudConstant.SCORE_COLOR,
+                              Score, "score", requires=Joined))
+    hud.add_widget(TextWidget(player, "P1", (15, -30), HudConstant.NAME_COLOR, follow=True, requires=Joined,
+                              requires_entity=player2))
+    hud.add_widget(TextWidget(player2, "P2", (15, -30), HudConstant.NAME_COLOR, follow=True, requires=Joined))
+    world.add_system(hud)
+    return hud
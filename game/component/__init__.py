@@ -1,4 +1,5 @@
 from .common import *
 from .component import *
 from .player import *
+from .columnar import *
 
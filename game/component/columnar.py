@@ -0,0 +1,151 @@
+from pygame.math import Vector2
+
+from common import Position
+from game.component.component import BulletDirection, Collision, Velocity
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ColumnStore:
+    """Contiguous float64 columns indexed by slot. Released slots are reused."""
+
+    def __init__(self, names: tuple[str, ...], capacity: int = 64):
+        if np is None:
+            raise ImportError("numpy is required for columnar storage")
+        self.names = names
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity) for name in names}
+        self.free = []
+        self.size = 0
+
+    def allocate(self) -> int:
+        if self.free:
+            return self.free.pop()
+        if self.size == self.capacity:
+            self.capacity *= 2
+            for name, column in self.columns.items():
+                grown = np.zeros(self.capacity)
+                grown[:self.size] = column
+                self.columns[name] = grown
+        slot = self.size
+        self.size += 1
+        return slot
+
+    def release(self, slot: int):
+        for column in self.columns.values():
+            column[slot] = 0.0
+        self.free.append(slot)
+
+
+def column_property(name: str):
+    def getter(self):
+        return float(self.store.columns[name][self.slot])
+
+    def setter(self, value):
+        self.store.columns[name][self.slot] = value
+
+    return property(getter, setter)
+
+
+class ColumnarPosition(Position):
+    __slots__ = ("store", "slot")
+
+    x = column_property("x")
+    y = column_property("y")
+    w = column_property("w")
+    h = column_property("h")
+
+    def __init__(self, store: ColumnStore, slot: int):
+        Vector2.__init__(self)
+        self.store = store
+        self.slot = slot
+
+    @staticmethod
+    def adopt(component: Position, store: ColumnStore, slot: int):
+        columnar = ColumnarPosition(store, slot)
+        columnar.x, columnar.y, columnar.w, columnar.h = component.x, component.y, component.w, component.h
+        return columnar
+
+    def detach(self) -> Position:
+        return self.copy()
+
+
+class ColumnarVelocity(Velocity):
+    __slots__ = ("store", "slot")
+
+    x = column_property("x")
+    y = column_property("y")
+
+    def __init__(self, store: ColumnStore, slot: int, speed: float):
+        Vector2.__init__(self)
+        self.store = store
+        self.slot = slot
+        self.speed = speed
+
+    @staticmethod
+    def adopt(component: Velocity, store: ColumnStore, slot: int):
+        columnar = ColumnarVelocity(store, slot, component.speed)
+        columnar.x, columnar.y = component.x, component.y
+        return columnar
+
+    def detach(self) -> Velocity:
+        velocity = Velocity(speed=self.speed)
+        velocity.x, velocity.y = self.x, self.y
+        return velocity
+
+
+class ColumnarBulletDirection(BulletDirection):
+    __slots__ = ("store", "slot")
+
+    x = column_property("x")
+    y = column_property("y")
+    speed = column_property("speed")
+
+    def __init__(self, store: ColumnStore, slot: int):
+        Vector2.__init__(self)
+        self.store = store
+        self.slot = slot
+
+    @staticmethod
+    def adopt(component: BulletDirection, store: ColumnStore, slot: int):
+        columnar = ColumnarBulletDirection(store, slot)
+        columnar.x, columnar.y, columnar.speed = component.x, component.y, component.speed
+        return columnar
+
+    def detach(self) -> BulletDirection:
+        direction = BulletDirection((self.x, self.y), self.speed)
+        direction.x, direction.y = self.x, self.y
+        return direction
+
+    # Vector2 methods implemented in C read their own coordinates, not the columns.
+    def normalize_ip(self):
+        vector = Vector2(self.x, self.y)
+        vector.normalize_ip()
+        self.x, self.y = vector.x, vector.y
+
+    def angle_to(self, other) -> float:
+        return Vector2(self.x, self.y).angle_to(other)
+
+
+class ColumnarCollision(Collision):
+    __slots__ = ("store", "slot")
+
+    times = column_property("times")
+
+    def __init__(self, store: ColumnStore, slot: int):
+        self.store = store
+        self.slot = slot
+
+    @staticmethod
+    def adopt(component: Collision, store: ColumnStore, slot: int):
+        columnar = ColumnarCollision(store, slot)
+        columnar.times = component.times
+        return columnar
+
+    def detach(self) -> Collision:
+        collision = Collision()
+        collision.times = int(self.times)
+        return collision
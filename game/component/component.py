@@ -1,28 +1,34 @@
+import heapq
 from typing import Optional
 
 from pygame.math import Vector2
-import time
 
 from game.constant import BulletConstant, EnemyConstant
 from ecs import Component
 
 
 class Passable(Component):
-    pass
+    __slots__ = ()
 
 
 class LookingDirection(Component):
+    __slots__ = ("x", "y")
+
     def __init__(self):
         self.x = 1
         self.y = 1
 
 
 class LiveState(Component):
+    __slots__ = ("alive",)
+
     def __init__(self):
         self.alive = True
 
 
 class BulletDirection(Component, Vector2):
+    __slots__ = ("speed",)
+
     def __init__(self, direction: tuple[float, float] = (1, 0), speed: float = BulletConstant.SPEED):
         super().__init__()
         self.x = direction[0]
@@ -36,21 +42,29 @@ class BulletDirection(Component, Vector2):
 
 
 class Collision(Component):
+    __slots__ = ("times",)
+
     def __init__(self):
         self.times = 0
 
 
 class Health(Component):
+    __slots__ = ("health",)
+
     def __init__(self):
         self.health = 0
 
 
 class Target(Component):
+    __slots__ = ("target",)
+
     def __init__(self):
         self.target = None
 
 
 class Velocity(Component, Vector2):
+    __slots__ = ("speed",)
+
     def __init__(self, direction: tuple[float, float] = (0, 0), speed: float = EnemyConstant.SPEED):
         super().__init__()
         self.x = direction[0]
@@ -63,22 +77,64 @@ class Velocity(Component, Vector2):
 
 
 class Cooldown:
-    def __init__(self, cooldown_type: str, duration: float, start: float):
+    __slots__ = ("cooldown_type", "start", "end", "duration")
+
+    def __init__(self, cooldown_type: str, duration: float, start: Optional[float]):
+        # A cooldown added before its CooldownDict is bound to a clock has no start yet.
         self.cooldown_type = cooldown_type
         self.start = start
-        self.end = start + duration
+        self.end = start + duration if start is not None else None
         self.duration = duration
 
-    def has_expired(self) -> bool:
-        return time.time() > self.end
+    def has_expired(self, now: float) -> bool:
+        return self.end is not None and now > self.end
 
     def add_duration(self, duration: float):
         return Cooldown(self.cooldown_type, self.duration + duration, self.start)
 
 
+class CooldownScheduler:
+    """Min-heap of cooldown end times, so only the cooldowns that expire are visited."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.heap = []
+        self.counter = 0
+
+    def schedule(self, cooldown_dict, cooldown: Cooldown):
+        heapq.heappush(self.heap, (cooldown.end, self.counter, cooldown_dict, cooldown))
+        self.counter += 1
+
+    def remove_expired(self) -> list:
+        """Drop the cooldowns that have expired, and return the dicts they were dropped from."""
+        now = self.clock.time
+        expired = []
+        while self.heap and self.heap[0][0] < now:
+            _, _, cooldown_dict, cooldown = heapq.heappop(self.heap)
+            # Cooldowns that were extended or removed since they were scheduled are stale.
+            if cooldown_dict.cooldown.get(cooldown.cooldown_type) is cooldown:
+                cooldown_dict.cooldown.pop(cooldown.cooldown_type)
+                expired.append(cooldown_dict)
+        return expired
+
+
 class CooldownDict(Component):
+    __slots__ = ("cooldown", "clock", "scheduler")
+
     def __init__(self):
         self.cooldown = {}
+        self.clock = None
+        self.scheduler: Optional[CooldownScheduler] = None
+
+    def bind(self, clock, scheduler: CooldownScheduler = None):
+        self.clock = clock
+        self.scheduler = scheduler
+        for cooldown_type, cooldown in list(self.cooldown.items()):
+            if cooldown.start is None:
+                cooldown = Cooldown(cooldown_type, cooldown.duration, clock.time)
+                self.cooldown[cooldown_type] = cooldown
+            if self.scheduler:
+                self.scheduler.schedule(self, cooldown)
 
     def get_cooldown(self, cooldown_type: str) -> Optional[Cooldown]:
         if cooldown_type not in self.cooldown:
@@ -88,15 +144,18 @@ class CooldownDict(Component):
     def has_cooldown_expired(self, cooldown_type: str) -> bool:
         if cooldown_type not in self.cooldown:
             return True
-        return self.cooldown[cooldown_type].has_expired()
+        if self.clock is None:
+            return False
+        return self.cooldown[cooldown_type].has_expired(self.clock.time)
 
     def add_cooldown(self, cooldown_type: str, duration: float):
-        if cooldown_type in self.cooldown and not self.cooldown[cooldown_type].has_expired():
+        if cooldown_type in self.cooldown and not self.has_cooldown_expired(cooldown_type):
             cooldown = self.cooldown[cooldown_type].add_duration(duration)
         else:
-            cooldown = Cooldown(cooldown_type, duration, time.time())
+            cooldown = Cooldown(cooldown_type, duration, self.clock.time if self.clock else None)
         self.cooldown[cooldown_type] = cooldown
-
+        if self.scheduler and cooldown.end is not None:
+            self.scheduler.schedule(self, cooldown)
 
     def remove_cooldown(self, cooldown: Cooldown):
         if cooldown.cooldown_type not in self.cooldown:
@@ -104,10 +163,8 @@ class CooldownDict(Component):
         self.cooldown.pop(cooldown.cooldown_type)
 
     def remove_expired_cooldowns(self):
+        if self.clock is None:
+            return
         for value in list(self.cooldown.values()):
-            if value.has_expired():
+            if value.has_expired(self.clock.time):
                 self.cooldown.pop(value.cooldown_type)
-
-
-
-
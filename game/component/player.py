@@ -2,23 +2,29 @@ from ecs import Component
 
 
 class Invincible(Component):
-    pass
+    __slots__ = ()
 
 
 class Joined(Component):
-    pass
+    __slots__ = ()
 
 
 class PlayerKeyBindings(Component):
+    __slots__ = ("key_bindings",)
+
     def __init__(self, key_bindings):
         self.key_bindings = key_bindings
 
 
 class PlayerTag(Component):
+    __slots__ = ("tags",)
+
     def __init__(self):
         self.tags = []
 
 
 class Score(Component):
+    __slots__ = ("score",)
+
     def __init__(self):
         self.score = 0
@@ -1,6 +1,10 @@
 class ScreenConstant:
     WIDTH: int = 800
     HEIGHT: int = 600
+    # Clear, scale and push the whole frame every tick instead of only the regions that changed.
+    FULL_REDRAW = False
+    # Fraction of the canvas that has to be dirty before a frame is scaled and pushed whole anyway.
+    FULL_REDRAW_RATIO = 0.5
 
 
 class GameConstant:
@@ -9,10 +13,46 @@ class GameConstant:
     SCORE_PER_BULLET = 5
     SCORE_PER_ENEMY = 10
     SCORE_PER_HIT_BY_BULLET = -20
+    # Keep Position, Velocity, BulletDirection and Collision in NumPy columns (requires numpy).
+    COLUMNAR_STORAGE = False
+
+
+class AssetConstant:
+    PLAYER = ("./asset/sprite/zero.png", "./asset/sprite/zero.json", "./asset/sprite/zero_state.json")
+    ENEMY = ("./asset/sprite/enemy/gm.png", "./asset/sprite/enemy/grenade_man.json",
+             "./asset/sprite/enemy/grenade_man_state.json")
+    BULLET = ("./asset/sprite/bullet.png", "./asset/sprite/bullet.json", "./asset/sprite/bullet_state.json")
+    TEST = ("./asset/sprite/enemy/grenade_man.png", "./asset/sprite/enemy/grenade_man.json",
+            "./asset/sprite/enemy/grenade_man_state.json")
+    BUNDLE_DIRECTORY = "./asset/.bundle"
+    # How preload_assets loads animations: "bundle", "atlas" or "sheet" (one surface per frame).
+    LOAD_MODE = "bundle"
 
 
 class AnimationConstant:
     STEP = 0.3
+    TRANSFORM_CACHE_BUDGET = 16 * 1024 * 1024
+    ROTATION_STEP = 1.0
+    ATLAS_PAGE_SIZE = 1024
+    ATLAS_PADDING = 1
+    LOADER_WORKERS = 2
+    # Render layers: actors are drawn in y order, effects on top of them in the order they appeared.
+    ACTOR_LAYER = 0
+    EFFECT_LAYER = 1
+
+
+class HudConstant:
+    FONT = "monospace"
+    FONT_SIZE = 24
+    TEXT_CACHE_SIZE = 256
+    SCORE_COLOR = (255, 255, 0)
+    NAME_COLOR = (0, 255, 255)
+
+
+class SpatialConstant:
+    CELL_SIZE = 16
+    # Largest distance an indexed Position center may drift between the rebuild and a query.
+    MARGIN = 4
 
 
 class PlayerConstant:
@@ -22,11 +62,16 @@ class PlayerConstant:
 class BulletConstant:
     SPEED = 3
     MAX_WALL_COLLISIONS = 3
+    HIT_DISTANCE = 10
+    POOL_PREWARM = 16
+    POOL_CAP = 256
 
 
 class EnemyConstant:
     SPEED = 2
     REACH_DISTANCE = 70
+    # Joined players from which nearest targets are looked up in a KD-tree (requires scipy).
+    KD_TREE_PLAYERS = 64
 
 
 class CooldownConstant:
@@ -1,8 +1,8 @@
 import random
 
 from game.constant import *
-from ecs import Entity
-from common import AnimationState, Position, State, AnimationRotation
+from ecs import Entity, EntityPool
+from common import AnimationState, Position, State, AnimationRotation, RenderLayer
 from game.component import LookingDirection, BulletDirection, Velocity, Target, CooldownDict, Collision, PlayerTag, \
     Score
 
@@ -13,6 +13,9 @@ class Game(Entity):
 
 
 class GameEntity(Entity):
+    # Animation assets every instance loads, preloaded at startup through get_asset_manifest.
+    assets: tuple[tuple[str, str, str], ...] = ()
+
     def __init__(self, entity_type: str, components=None):
         super().__init__(entity_type, components)
         self.add_component(CooldownDict())
@@ -27,9 +30,7 @@ class TestEntity(GameEntity):
         # animation_state = AnimationState.load("./asset/sprite/zero.png", "./asset/sprite/zero.json",
         #                                       "./asset/sprite/zero_state.json")
 
-        animation_state = AnimationState.load("./asset/sprite/enemy/grenade_man.png",
-                                              "./asset/sprite/enemy/grenade_man.json",
-                                              "./asset/sprite/enemy/grenade_man_state.json")
+        animation_state = AnimationState.load(*AssetConstant.TEST)
 
         animation_state.current_state = "idle"
         state = State("idle")
@@ -47,10 +48,11 @@ class TestEntity(GameEntity):
 
 
 class Player(GameEntity):
+    assets = (AssetConstant.PLAYER,)
+
     def __init__(self, initial_state="join", initial_animation_state="join"):
         super().__init__("Player", None)
-        animation_state = AnimationState.load("./asset/sprite/zero.png", "./asset/sprite/zero.json",
-                                              "./asset/sprite/zero_state.json")
+        animation_state = AnimationState.load(*AssetConstant.PLAYER)
         animation_state.current_state = initial_animation_state
         state = State(initial_state)
 
@@ -68,23 +70,24 @@ class Player(GameEntity):
 
 
 class Enemy(GameEntity):
-    def __init__(self):
+    assets = (AssetConstant.ENEMY,)
+
+    def __init__(self, rng=None):
         super().__init__("Opponent", None)
-        animation_state = AnimationState.load("./asset/sprite/enemy/gm.png",
-                                              "./asset/sprite/enemy/grenade_man.json",
-                                              "./asset/sprite/enemy/grenade_man_state.json")
+        rng = rng if rng is not None else random
+        animation_state = AnimationState.load(*AssetConstant.ENEMY)
         animation_state.current_state = "idle"
         state = State("idle")
 
         position = Position()
-        position.x = random.uniform(-200, -100)
-        choice_x = random.choice((0, 1))
+        position.x = rng.uniform(-200, -100)
+        choice_x = rng.choice((0, 1))
         if choice_x == 1:
-            position.x = random.uniform(GameConstant.WIDTH_BOUNDARY + 100, GameConstant.WIDTH_BOUNDARY + 200)
-        position.y = random.uniform(-200, -100)
-        choice_y = random.choice((0, 1))
+            position.x = rng.uniform(GameConstant.WIDTH_BOUNDARY + 100, GameConstant.WIDTH_BOUNDARY + 200)
+        position.y = rng.uniform(-200, -100)
+        choice_y = rng.choice((0, 1))
         if choice_y == 1:
-            position.y = random.uniform(GameConstant.HEIGHT_BOUNDARY + 100, GameConstant.HEIGHT_BOUNDARY + 200)
+            position.y = rng.uniform(GameConstant.HEIGHT_BOUNDARY + 100, GameConstant.HEIGHT_BOUNDARY + 200)
         position.w = 32
         position.h = 32
 
@@ -104,27 +107,55 @@ class Enemy(GameEntity):
 
 
 class Bullet(GameEntity):
+    assets = (AssetConstant.BULLET,)
+
     def __init__(self, position: tuple[float, float], direction: tuple[float, float]):
         super().__init__("bullet", None)
-        animation_state = AnimationState.load("./asset/sprite/bullet.png", "./asset/sprite/bullet.json",
-                                              "./asset/sprite/bullet_state.json")
+        self.add_component(Position())
+        self.add_component(State())
+        self.add_component(BulletDirection(direction))
+        self.add_component(AnimationState.load(*AssetConstant.BULLET))
+        self.add_component(AnimationRotation())
+        self.add_component(RenderLayer(AnimationConstant.EFFECT_LAYER))
+        self.add_component(Collision())
+        self.reset(position, direction)
+
+    def reset(self, position: tuple[float, float], direction: tuple[float, float]):
+        animation_state = self.get_component(AnimationState)
         animation_state.current_state = "warm_up"
-        state = State("warm_up")
+        animation_state.indices.clear()
+        self.get_component(State).current = "warm_up"
 
-        position_component = Position()
+        position_component = self.get_component(Position)
         position_component.x = position[0]
         position_component.y = position[1]
         position_component.w = 16
         position_component.h = 27
 
-        bullet_direction = BulletDirection(direction)
-
-        anim_rotation = AnimationRotation()
-        anim_rotation.rotation = 90
-
-        self.add_component(position_component)
-        self.add_component(state)
-        self.add_component(bullet_direction)
-        self.add_component(animation_state)
-        self.add_component(anim_rotation)
-        self.add_component(Collision())
+        bullet_direction = self.get_component(BulletDirection)
+        bullet_direction.x = direction[0]
+        bullet_direction.y = direction[1]
+        bullet_direction.speed = BulletConstant.SPEED
+        bullet_direction.normalize_ip()
+
+        self.get_component(AnimationRotation).rotation = 90
+        self.get_component(Collision).times = 0
+        self.get_component(CooldownDict).cooldown.clear()
+
+    @staticmethod
+    def create_pool(prewarm: int = BulletConstant.POOL_PREWARM, cap: int = BulletConstant.POOL_CAP) -> EntityPool:
+        return EntityPool(lambda: Bullet((0, 0), (1, 0)), Bullet.reset,
+                          lambda bullet: bullet.get_component(AnimationState).release(), prewarm, cap)
+
+
+def get_asset_manifest(entity_class: type = GameEntity) -> list[tuple[str, str, str]]:
+    """Assets of entity_class and all of its subclasses, without repeats."""
+    manifest = []
+    classes = [entity_class]
+    while classes:
+        cls = classes.pop(0)
+        for paths in getattr(cls, "assets", ()):
+            if paths not in manifest:
+                manifest.append(paths)
+        classes.extend(cls.__subclasses__())
+    return manifest
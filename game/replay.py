@@ -0,0 +1,145 @@
+import struct
+from bisect import bisect_right
+from typing import Optional
+
+import pygame
+
+from ecs import World
+from game.component import PlayerKeyBindings
+from game.entity import Player
+
+# Replay layout, little endian:
+#   header:   magic, version, whether the world was seeded, seed, timestep, player count
+#   bindings: per player, the action count, then each action's name length, name and key
+#   runs:     tick count, then the key mask of every player, appended whenever the masks change
+MAGIC = b"RPLY"
+VERSION = 1
+HEADER = struct.Struct("<4sH?qdH")
+ACTION_COUNT = struct.Struct("<B")
+ACTION = struct.Struct("<Bi")
+RUN_LENGTH = struct.Struct("<H")
+MAX_RUN = 0xFFFF
+
+
+def get_run_struct(player_count: int) -> struct.Struct:
+    return struct.Struct(f"<H{player_count}H")
+
+
+class ReplayWriter:
+    """Appends the key masks of every player to a replay file, one run of identical ticks at a time."""
+
+    def __init__(self, path: str, bindings: list[dict[str, int]], seed: Optional[int], dt: float):
+        self.file = open(path, "wb")
+        self.run = get_run_struct(len(bindings))
+        self.masks = None
+        self.length = 0
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed is not None, seed or 0, dt, len(bindings)))
+        for key_bindings in bindings:
+            self.file.write(ACTION_COUNT.pack(len(key_bindings)))
+            for action, key in key_bindings.items():
+                name = action.encode()
+                self.file.write(ACTION.pack(len(name), key))
+                self.file.write(name)
+
+    def append(self, masks: tuple[int, ...]):
+        if masks != self.masks or self.length == MAX_RUN:
+            self.flush()
+            self.masks = masks
+        self.length += 1
+
+    def flush(self):
+        if self.length:
+            self.file.write(self.run.pack(self.length, *self.masks))
+            self.file.flush()
+        self.length = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class InputRecorder:
+    """Key source that records what each player's bindings see of another source.
+
+    The bindings and the world's seed are written with the first tick, once the players exist.
+    """
+
+    def __init__(self, world: World, path: str, source=None):
+        self.world = world
+        self.path = path
+        self.source = source if source is not None else pygame.key.get_pressed
+        self.bindings: list[dict[str, int]] = []
+        self.writer: Optional[ReplayWriter] = None
+
+    def __call__(self):
+        keys = self.source()
+        if self.writer is None:
+            self.bindings = [dict(player.get_component(PlayerKeyBindings).key_bindings)
+                             for player in self.world.get_entities(Player) if player.has_component(PlayerKeyBindings)]
+            self.writer = ReplayWriter(self.path, self.bindings, self.world.seed, self.world.clock.dt)
+        self.writer.append(tuple(sum(1 << bit for bit, key in enumerate(key_bindings.values()) if keys[key])
+                                 for key_bindings in self.bindings))
+        return keys
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class Replay:
+    """A recorded match: its seed, timestep and the keys held on every tick.
+
+    Called with a tick it returns those keys, so it can script a ScriptedInput.
+    """
+
+    def __init__(self, seed: Optional[int], dt: float, bindings: list[dict[str, int]],
+                 ends: list[int], pressed: list[tuple[int, ...]]):
+        self.seed = seed
+        self.dt = dt
+        self.bindings = bindings
+        # Tick each run ends before, and the keys held during it.
+        self.ends = ends
+        self.pressed = pressed
+
+    @property
+    def ticks(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+    def __call__(self, tick: int) -> tuple[int, ...]:
+        index = bisect_right(self.ends, tick)
+        return self.pressed[index] if index < len(self.pressed) else ()
+
+    @staticmethod
+    def load(path: str) -> "Replay":
+        with open(path, "rb") as replay_file:
+            data = replay_file.read()
+        replay_file.close()
+
+        magic, version, has_seed, seed, dt, player_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a replay of this version")
+        position = HEADER.size
+        bindings = []
+        for _ in range(player_count):
+            action_count, = ACTION_COUNT.unpack_from(data, position)
+            position += ACTION_COUNT.size
+            key_bindings = {}
+            for _ in range(action_count):
+                name_length, key = ACTION.unpack_from(data, position)
+                position += ACTION.size
+                key_bindings[data[position:position + name_length].decode()] = key
+                position += name_length
+            bindings.append(key_bindings)
+
+        run = get_run_struct(player_count)
+        ends = []
+        pressed = []
+        tick = 0
+        # A run cut short by a crash is dropped.
+        end = position + (len(data) - position) // run.size * run.size
+        for length, *masks in run.iter_unpack(data[position:end]):
+            tick += length
+            ends.append(tick)
+            pressed.append(tuple(key for key_bindings, mask in zip(bindings, masks)
+                                 for bit, key in enumerate(key_bindings.values()) if mask >> bit & 1))
+        return Replay(seed if has_seed else None, dt, bindings, ends, pressed)
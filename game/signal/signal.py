@@ -3,6 +3,10 @@ from game.entity import Player, Bullet, Enemy
 
 
 class EntityCollideSignal(Signal):
+    filters = {
+        "entity_type": lambda signal: type(signal.entity),
+    }
+
     def __init__(self, entity: Entity):
         self.entity = entity
 
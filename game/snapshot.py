@@ -0,0 +1,142 @@
+import struct
+
+from ecs import ComponentCodec, StructCodec, SnapshotWriter, SnapshotReader, SnapshotRegistry, snapshot_registry
+from common import Position, State, AnimationState, AnimationRotation
+from game.component import LookingDirection, BulletDirection, Velocity, Target, Collision, Health, LiveState, \
+    CooldownDict, Cooldown, Passable, Invincible, Joined, PlayerKeyBindings, Score
+from game.entity import Player, Enemy, Bullet
+from game.system.enemy import EnemyAttackSystem
+
+COUNT = struct.Struct("<H")
+STRING = struct.Struct("<H")
+COOLDOWN = struct.Struct("<H?dd")
+INDEX = struct.Struct("<Hd")
+BINDING = struct.Struct("<Hi")
+
+# Components the outcome of a match depends on, hashed to tell whether two runs stayed in sync.
+SIMULATION_COMPONENTS = (Position, State, Score, Collision, CooldownDict)
+
+
+class StateCodec(ComponentCodec):
+    format = "H"
+
+    def get_values(self, writer: SnapshotWriter, component: State) -> tuple:
+        return writer.string(component.current),
+
+    def set_values(self, reader: SnapshotReader, component: State, values: list):
+        component.current = reader.string(values[0])
+
+
+class CollisionCodec(ComponentCodec):
+    format = "i"
+
+    def get_values(self, writer: SnapshotWriter, component: Collision) -> tuple:
+        # Columnar collisions count in floats.
+        return int(component.times),
+
+    def set_values(self, reader: SnapshotReader, component: Collision, values: list):
+        component.times = values[0]
+
+
+class TargetCodec(ComponentCodec):
+    format = "I"
+
+    def get_values(self, writer: SnapshotWriter, component: Target) -> tuple:
+        return writer.entity(component.target),
+
+    def set_values(self, reader: SnapshotReader, component: Target, values: list):
+        component.target = reader.entity(values[0])
+
+
+class CooldownDictCodec(ComponentCodec):
+    """Running cooldowns, rescheduled if the dict is already bound to a scheduler."""
+
+    format = None
+
+    def write(self, writer: SnapshotWriter, component: CooldownDict):
+        writer.pack(COUNT, len(component.cooldown))
+        for cooldown in component.cooldown.values():
+            writer.pack(COOLDOWN, writer.string(cooldown.cooldown_type), cooldown.start is not None,
+                        cooldown.start or 0.0, cooldown.duration)
+
+    def read(self, reader: SnapshotReader, component: CooldownDict):
+        component.cooldown = {}
+        count, = reader.unpack(COUNT)
+        for _ in range(count):
+            type_index, has_start, start, duration = reader.unpack(COOLDOWN)
+            cooldown = Cooldown(reader.string(type_index), duration, start if has_start else None)
+            component.cooldown[cooldown.cooldown_type] = cooldown
+            if component.scheduler and cooldown.end is not None:
+                component.scheduler.schedule(component, cooldown)
+
+
+class AnimationStateCodec(ComponentCodec):
+    """The playback cursor only; the animations stay those the entity was built with."""
+
+    format = None
+
+    def write(self, writer: SnapshotWriter, component: AnimationState):
+        writer.pack(STRING, writer.string(component.current_state))
+        writer.pack(COUNT, len(component.indices))
+        for state, index in component.indices.items():
+            writer.pack(INDEX, writer.string(state), index)
+
+    def read(self, reader: SnapshotReader, component: AnimationState):
+        component.current_state = reader.string(*reader.unpack(STRING))
+        component.indices = {}
+        count, = reader.unpack(COUNT)
+        for _ in range(count):
+            state_index, index = reader.unpack(INDEX)
+            component.indices[reader.string(state_index)] = index
+
+
+class PlayerKeyBindingsCodec(ComponentCodec):
+    format = None
+
+    def make(self) -> PlayerKeyBindings:
+        return PlayerKeyBindings({})
+
+    def write(self, writer: SnapshotWriter, component: PlayerKeyBindings):
+        writer.pack(COUNT, len(component.key_bindings))
+        for action, key in component.key_bindings.items():
+            writer.pack(BINDING, writer.string(action), key)
+
+    def read(self, reader: SnapshotReader, component: PlayerKeyBindings):
+        component.key_bindings = {}
+        count, = reader.unpack(COUNT)
+        for _ in range(count):
+            action_index, key = reader.unpack(BINDING)
+            component.key_bindings[reader.string(action_index)] = key
+
+
+def make_bullet(world) -> Bullet:
+    # Bullets removed while rolling back went back to the pool enemies fire from.
+    attack_system = world.get_system(EnemyAttackSystem)
+    if attack_system is not None:
+        return attack_system.bullet_pool.acquire((0, 0), (1, 0))
+    return Bullet((0, 0), (1, 0))
+
+
+def register_snapshot_types(registry: SnapshotRegistry = snapshot_registry):
+    """Codecs for the components the simulation depends on, and factories for the game's entities."""
+    registry.register_codec(StructCodec(Position, "4d", "x", "y", "w", "h"))
+    registry.register_codec(StateCodec(State))
+    registry.register_codec(StructCodec(Score, "i", "score"))
+    registry.register_codec(CooldownDictCodec(CooldownDict))
+    registry.register_codec(CollisionCodec(Collision))
+    registry.register_codec(StructCodec(BulletDirection, "3d", "x", "y", "speed"))
+    registry.register_codec(StructCodec(Velocity, "3d", "x", "y", "speed"))
+    registry.register_codec(TargetCodec(Target))
+    registry.register_codec(AnimationStateCodec(AnimationState))
+    registry.register_codec(StructCodec(AnimationRotation, "d", "rotation"))
+    registry.register_codec(StructCodec(LookingDirection, "2d", "x", "y"))
+    registry.register_codec(StructCodec(Health, "i", "health"))
+    registry.register_codec(StructCodec(LiveState, "?", "alive"))
+    registry.register_codec(PlayerKeyBindingsCodec(PlayerKeyBindings))
+    registry.register_codec(ComponentCodec(Passable))
+    registry.register_codec(ComponentCodec(Invincible))
+    registry.register_codec(ComponentCodec(Joined))
+
+    registry.register_entity(Player, lambda world: Player())
+    registry.register_entity(Enemy, lambda world: Enemy(world.random))
+    registry.register_entity(Bullet, make_bullet)
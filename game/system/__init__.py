@@ -1,4 +1,6 @@
 from .system import *
 from .player import *
 from .bullet import *
+from .columnar import *
+from .hud import *
 
@@ -1,15 +1,25 @@
 from pygame.math import Vector2
 
-from common import State, Position, AnimationRotation
+from common import State, Position, AnimationRotation, SpatialIndex
 from ecs import System
 from game.component import BulletDirection, Collision, Passable, Score
+from game.component.columnar import np
 from game.constant import ScreenConstant, BulletConstant, PlayerConstant, GameConstant
 from game.entity import Bullet, Player
 from game.signal import PlayerAttackSignal, BulletCollideWithPlayerSignal, EntityCollideSignal
+from game.system.columnar import ColumnarStorage
 
 
 class BulletMovementSystem(System):
+    reads = (State, BulletDirection)
+    writes = (Position,)
+
     def process(self):
+        storage = self.world.get_system(ColumnarStorage)
+        if storage:
+            self.process_columns(storage)
+            return
+
         bullets = self.world.entity_container.get_entities(Bullet)
 
         for bullet in bullets:
@@ -23,13 +33,30 @@ class BulletMovementSystem(System):
 
             position.x += bullet_direction.x * bullet_direction.speed
             position.y += bullet_direction.y * bullet_direction.speed
+            bullet.mark_changed(Position)
+
+    def process_columns(self, storage: ColumnarStorage):
+        bullets, (position_slots, direction_slots) = storage.slots(Bullet, Position, BulletDirection)
+        running = np.fromiter((bullet.components[State].current == "run" for bullet in bullets), dtype=bool,
+                              count=len(bullets))
+        self.world.mark_changed(Position, (bullets[index] for index in np.flatnonzero(running)))
+        position_slots = position_slots[running]
+        direction_slots = direction_slots[running]
+
+        positions = storage.columns(Position)
+        directions = storage.columns(BulletDirection)
+        speed = directions["speed"][direction_slots]
+        positions["x"][position_slots] += directions["x"][direction_slots] * speed
+        positions["y"][position_slots] += directions["y"][direction_slots] * speed
 
 
 class BulletRotationSystem(System):
-    def process(self):
-        bullets = self.world.entity_container.get_entities(Bullet)
+    reads = (BulletDirection,)
+    writes = (AnimationRotation,)
 
-        for bullet in bullets:
+    def process(self):
+        # Directions only change when bullets are fired, bounce off a wall or are deflected.
+        for bullet in self.world.changed(BulletDirection, self):
             bullet_direction = bullet.get_component(BulletDirection)
             bullet_rotation = bullet.get_component(AnimationRotation)
             # angle = Vector2((1, 0)).angle_to(bullet_direction)
@@ -44,39 +71,94 @@ class BulletCollisionSystem(System):
 
     def process(self):
         bullets = self.world.entity_container.get_entities(Bullet)
-        players = self.world.entity_container.get_entities(Player)
 
-        for bullet in bullets:
+        # Dealing with walls
+        storage = self.world.get_system(ColumnarStorage)
+        if storage:
+            self.bounce_columns(storage)
+        else:
+            for bullet in bullets:
+                self.bounce(bullet)
+
+        # Dealing with players
+        players = self.world.entity_container.get_entities(Player)
+        spatial_index = self.world.get_system(SpatialIndex)
+        if spatial_index:
+            nearby_players = {}
+            for bullet, player in spatial_index.query_pairs(Bullet, Player, BulletConstant.HIT_DISTANCE):
+                nearby_players.setdefault(bullet, []).append(player)
+            # Bullets were added in id order, which is also the order of the full scan.
+            candidates = sorted(nearby_players.items(), key=lambda item: item[0].id)
+        else:
+            candidates = [(bullet, players) for bullet in bullets]
+
+        for bullet, bullet_players in candidates:
             position = bullet.get_component(Position)
-            bullet_state = bullet.get_component(State)
-            bullet_direction = bullet.get_component(BulletDirection)
-            collision = bullet.get_component(Collision)
-
-            # Dealing with walls
-            if position.x < 0 or position.x > GameConstant.WIDTH_BOUNDARY:
-                bullet_direction.x = -bullet_direction.x
-                collision.times += 1
-            if position.y < 0 or position.y > GameConstant.HEIGHT_BOUNDARY:
-                bullet_direction.y = -bullet_direction.y
-                collision.times += 1
-            bullet_direction.normalize_ip()
-            if collision.times >= BulletConstant.MAX_WALL_COLLISIONS:
-                bullet_state.current = "dead"
-
-            # Dealing with players
-            for player in players:
+            for player in bullet_players:
                 player_pos = player.get_component(Position)
 
-                if position.distance(player_pos) < 10:
+                if position.distance(player_pos) < BulletConstant.HIT_DISTANCE:
                     if not player.has_component(Passable):
                         self.world.dispatch_signal(BulletCollideWithPlayerSignal(bullet, player))
                         self.world.dispatch_signal(EntityCollideSignal(bullet))
                         break
 
+    @staticmethod
+    def bounce(bullet: Bullet):
+        position = bullet.get_component(Position)
+        bullet_state = bullet.get_component(State)
+        bullet_direction = bullet.get_component(BulletDirection)
+        collision = bullet.get_component(Collision)
+
+        if position.x < 0 or position.x > GameConstant.WIDTH_BOUNDARY:
+            bullet_direction.x = -bullet_direction.x
+            collision.times += 1
+            bullet.mark_changed(BulletDirection)
+            bullet.mark_changed(Collision)
+        if position.y < 0 or position.y > GameConstant.HEIGHT_BOUNDARY:
+            bullet_direction.y = -bullet_direction.y
+            collision.times += 1
+            bullet.mark_changed(BulletDirection)
+            bullet.mark_changed(Collision)
+        bullet_direction.normalize_ip()
+        if collision.times >= BulletConstant.MAX_WALL_COLLISIONS:
+            bullet_state.current = "dead"
+            bullet.mark_changed(State)
+
+    def bounce_columns(self, storage: ColumnarStorage):
+        bullets, (position_slots, direction_slots, collision_slots) = storage.slots(
+            Bullet, Position, BulletDirection, Collision)
+        positions = storage.columns(Position)
+        directions = storage.columns(BulletDirection)
+        times = storage.columns(Collision)["times"]
+
+        x = positions["x"][position_slots]
+        y = positions["y"][position_slots]
+        outside_x = (x < 0) | (x > GameConstant.WIDTH_BOUNDARY)
+        outside_y = (y < 0) | (y > GameConstant.HEIGHT_BOUNDARY)
+
+        direction_x = np.where(outside_x, -directions["x"][direction_slots], directions["x"][direction_slots])
+        direction_y = np.where(outside_y, -directions["y"][direction_slots], directions["y"][direction_slots])
+        length = np.sqrt(direction_x * direction_x + direction_y * direction_y)
+        directions["x"][direction_slots] = direction_x / length
+        directions["y"][direction_slots] = direction_y / length
+        bounced = [bullets[index] for index in np.flatnonzero(outside_x | outside_y)]
+        self.world.mark_changed(BulletDirection, bounced)
+
+        times[collision_slots] += outside_x.astype(float) + outside_y
+        self.world.mark_changed(Collision, bounced)
+        for index in np.flatnonzero(times[collision_slots] >= BulletConstant.MAX_WALL_COLLISIONS):
+            bullets[index].get_component(State).current = "dead"
+            bullets[index].mark_changed(State)
+
     def on_player_attack(self, player_attack_signal: PlayerAttackSignal):
         player = player_attack_signal.player
         player_position = player.get_component(Position)
-        bullets = self.world.get_entities(Bullet)
+        spatial_index = self.world.get_system(SpatialIndex)
+        if spatial_index:
+            bullets = spatial_index.query_radius(player_position, PlayerConstant.ATTACK_RANGE, Bullet)
+        else:
+            bullets = self.world.get_entities(Bullet)
 
         for bullet in bullets:
             position = bullet.get_component(Position)
@@ -87,4 +169,6 @@ class BulletCollisionSystem(System):
                 direction.x = diff_x
                 direction.y = diff_y
                 direction.normalize_ip()
+                bullet.mark_changed(BulletDirection)
                 player.get_component(Score).score += GameConstant.SCORE_PER_BULLET
+                player.mark_changed(Score)
@@ -0,0 +1,80 @@
+from common import Position
+from ecs import System, EntityAddedSignal, EntityRemovedSignal
+from game.component import Velocity, BulletDirection, Collision
+from game.component.columnar import ColumnStore, ColumnarPosition, ColumnarVelocity, ColumnarBulletDirection, \
+    ColumnarCollision, np
+
+
+class ColumnarStorage(System):
+    """Moves Position, Velocity, BulletDirection and Collision into NumPy columns.
+
+    Components are swapped for subclasses that read and write their slot, so code that works on
+    a single entity is unchanged, while systems can update the columns of many entities at once.
+    """
+
+    reads = ()
+    writes = ()
+
+    def __init__(self, world):
+        super().__init__(world)
+        self.stores = {
+            Position: ColumnStore(("x", "y", "w", "h")),
+            Velocity: ColumnStore(("x", "y")),
+            BulletDirection: ColumnStore(("x", "y", "speed")),
+            Collision: ColumnStore(("times",)),
+        }
+        self.columnar_types = {
+            Position: ColumnarPosition,
+            Velocity: ColumnarVelocity,
+            BulletDirection: ColumnarBulletDirection,
+            Collision: ColumnarCollision,
+        }
+        self.version = 0
+        self.slot_cache = {}
+
+        self.world.register_handler(EntityAddedSignal, self.on_entity_added)
+        self.world.register_handler(EntityRemovedSignal, self.on_entity_removed)
+        for entity in self.world.get_entities():
+            self.adopt(entity)
+
+    def columns(self, component_type: type) -> dict:
+        return self.stores[component_type].columns
+
+    def adopt(self, entity):
+        for component_type, columnar_type in self.columnar_types.items():
+            component = entity.components.get(component_type)
+            if component is None or type(component) is columnar_type:
+                continue
+            store = self.stores[component_type]
+            # Replaced in place: the entity keeps the same component signature.
+            entity.components[component_type] = columnar_type.adopt(component, store, store.allocate())
+        self.version += 1
+
+    def detach(self, entity):
+        for component_type, columnar_type in self.columnar_types.items():
+            component = entity.components.get(component_type)
+            if type(component) is not columnar_type:
+                continue
+            entity.components[component_type] = component.detach()
+            self.stores[component_type].release(component.slot)
+        self.version += 1
+
+    def on_entity_added(self, signal: EntityAddedSignal):
+        self.adopt(signal.entity)
+
+    def on_entity_removed(self, signal: EntityRemovedSignal):
+        self.detach(signal.entity)
+
+    def slots(self, entity_type: type, *component_types: type):
+        """Entities of entity_type and, per component type, the array of their slots."""
+        key = (entity_type, component_types)
+        cached = self.slot_cache.get(key)
+        if cached and cached[0] == self.version:
+            return cached[1], cached[2]
+        entities = self.world.get_entities(entity_type)
+        slots = tuple(
+            np.fromiter((entity.components[component_type].slot for entity in entities), dtype=np.intp,
+                        count=len(entities))
+            for component_type in component_types)
+        self.slot_cache[key] = (self.version, entities, slots)
+        return entities, slots
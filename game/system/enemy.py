@@ -5,11 +5,81 @@ from ecs import System
 from game.component import Target, Velocity, CooldownDict, Joined, LookingDirection
 from game.constant import EnemyConstant, CooldownConstant
 from game.entity import Player, Enemy, Bullet
+from game.system.columnar import ColumnarStorage
+from game.component.columnar import np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
 
 
 class EnemySelectTargetSystem(System):
+    """Targets every enemy at its nearest joined player.
+
+    With NumPy all distances are computed in one pass, or looked up in a KD-tree once there are
+    many players, and nothing is reassigned while neither enemies nor players have moved.
+    """
+
+    reads = (Position, Joined)
+    writes = (Target,)
+
+    def __init__(self, world):
+        super().__init__(world)
+        self.enemies = None
+        self.players = None
+        self.enemy_centers = None
+        self.player_centers = None
+
+    def get_centers(self, entity_type: type) -> tuple[list, "np.ndarray"]:
+        """Entities of entity_type and the Position.center of each, as an (n, 2) array."""
+        storage = self.world.get_system(ColumnarStorage)
+        if storage:
+            entities, (slots,) = storage.slots(entity_type, Position)
+            positions = storage.columns(Position)
+            x, y, w, h = (positions[name][slots] for name in ("x", "y", "w", "h"))
+        else:
+            entities = self.world.entity_container.get_entities(entity_type)
+            positions = [entity.get_component(Position) for entity in entities]
+            x, y, w, h = np.array([(position.x, position.y, position.w, position.h) for position in positions],
+                                  dtype=np.float64).reshape(-1, 4).T
+        return entities, np.column_stack(((x + w) / 2.0, (y + h) / 2.0))
+
     def process(self):
-        players = self.world.entity_container.get_entities(Player)
+        if np is None:
+            self.process_scalar()
+            return
+
+        enemies, enemy_centers = self.get_centers(Enemy)
+        players, player_centers = self.get_centers(Player)
+        joined = np.fromiter((player.has_component(Joined) for player in players), dtype=bool, count=len(players))
+        players = [player for player, is_joined in zip(players, joined) if is_joined]
+        player_centers = player_centers[joined]
+
+        if (enemies == self.enemies and players == self.players
+                and np.array_equal(enemy_centers, self.enemy_centers)
+                and np.array_equal(player_centers, self.player_centers)):
+            return
+        self.enemies, self.players = list(enemies), players
+        self.enemy_centers, self.player_centers = enemy_centers, player_centers
+
+        if not players:
+            for enemy in enemies:
+                enemy.get_component(Target).target = None
+            return
+
+        if cKDTree is not None and len(players) >= EnemyConstant.KD_TREE_PLAYERS:
+            _, nearest = cKDTree(player_centers).query(enemy_centers)
+        else:
+            deltas = enemy_centers[:, np.newaxis, :] - player_centers[np.newaxis, :, :]
+            nearest = np.argmin(np.hypot(deltas[..., 0], deltas[..., 1]), axis=1)
+
+        for enemy, index in zip(enemies, nearest.tolist()):
+            enemy.get_component(Target).target = players[index]
+
+    def process_scalar(self):
+        players = [player for player in self.world.entity_container.get_entities(Player)
+                   if player.has_component(Joined)]
         enemies = self.world.entity_container.get_entities(Enemy)
 
         # Select nearest player as target
@@ -23,9 +93,6 @@ class EnemySelectTargetSystem(System):
             enemy_target.target = None
 
             for player in players:
-                if not player.has_component(Joined):
-                    continue
-
                 player_pos = player.get_component(Position)
                 distance = enemy_pos.distance(player_pos)
                 if distance < min_distance:
@@ -45,6 +112,9 @@ class EnemyLookingDirection(System):
 
 
 class EnemyVelocitySystem(System):
+    reads = (Position, Target)
+    writes = (State, AnimationState, Velocity, LookingDirection)
+
     def process(self):
         enemies = self.world.entity_container.get_entities(Enemy)
 
@@ -73,10 +143,12 @@ class EnemyVelocitySystem(System):
             if target_position.distance(position) < EnemyConstant.REACH_DISTANCE:
                 state.current = "idle"
                 anim_state.current_state = "idle"
+                enemy.mark_changed(State)
                 continue
 
             state.current = "run"
             anim_state.current_state = "run"
+            enemy.mark_changed(State)
 
             diff_x = target_position.x - position.x
             diff_y = target_position.y - position.y
@@ -90,7 +162,21 @@ class EnemyVelocitySystem(System):
 
 
 class EnemyPositionSystem(System):
+    reads = (Velocity,)
+    writes = (Position,)
+
     def process(self):
+        storage = self.world.get_system(ColumnarStorage)
+        if storage:
+            enemies, (position_slots, velocity_slots) = storage.slots(Enemy, Position, Velocity)
+            positions = storage.columns(Position)
+            velocities = storage.columns(Velocity)
+            positions["x"][position_slots] += velocities["x"][velocity_slots]
+            positions["y"][position_slots] += velocities["y"][velocity_slots]
+            moving = (velocities["x"][velocity_slots] != 0) | (velocities["y"][velocity_slots] != 0)
+            self.world.mark_changed(Position, (enemies[index] for index in moving.nonzero()[0]))
+            return
+
         enemies = self.world.entity_container.get_entities(Enemy)
 
         for enemy in enemies:
@@ -99,9 +185,15 @@ class EnemyPositionSystem(System):
 
             position.x += velocity.x
             position.y += velocity.y
+            if velocity.x or velocity.y:
+                enemy.mark_changed(Position)
 
 
 class EnemyAttackSystem(System):
+    def __init__(self, world):
+        super().__init__(world)
+        self.bullet_pool = Bullet.create_pool()
+
     def process(self):
         enemies = self.world.entity_container.get_entities(Enemy)
 
@@ -118,6 +210,7 @@ class EnemyAttackSystem(System):
                 continue
 
             cooldown_dict.add_cooldown(CooldownConstant.ENEMY_FIRE_BULLET, CooldownConstant.ENEMY_FIRE_BULLET_COOLDOWN)
+            enemy.mark_changed(CooldownDict)
 
             position = enemy.get_component(Position)
             target = enemy.get_component(Target)
@@ -127,6 +220,7 @@ class EnemyAttackSystem(System):
             anim_state = enemy.get_component(AnimationState)
             state.current = "attack"
             anim_state.current_state = "attack"
+            enemy.mark_changed(State)
 
-            bullet = Bullet(position.copy(), direction)
-            self.world.entity_container.add_entity(bullet)
+            bullet = self.bullet_pool.acquire(position.copy(), direction)
+            self.world.add_entity(bullet)
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+import pygame
+from pygame.surface import Surface
+
+from common import Position, Renderer
+from ecs import System, Entity
+from game.component import Score, Joined
+from game.constant import HudConstant
+
+
+class TextCache:
+    """Rendered text surfaces keyed by text and color. The least recently used are dropped first."""
+
+    def __init__(self, font: pygame.font.Font, capacity: int = HudConstant.TEXT_CACHE_SIZE):
+        self.font = font
+        self.capacity = capacity
+        self.surfaces: OrderedDict[tuple, Surface] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text: str, color) -> Surface:
+        key = (text, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class TextWidget:
+    """Text bound to an attribute of one of an entity's components.
+
+    The text is drawn at a fixed screen position, or offset from the entity's position when it follows
+    the entity. It is only formatted again when the bound value changes. Widgets with a required
+    component are hidden while the entity lacks it, or while requires_entity does when it is given.
+    """
+
+    def __init__(self, entity: Entity, template: str, position: tuple[float, float], color,
+                 component_type: type = None, attribute: str = None, follow: bool = False, requires: type = None,
+                 requires_entity: Entity = None):
+        self.entity = entity
+        self.template = template
+        self.position = position
+        self.color = color
+        self.component_type = component_type
+        self.attribute = attribute
+        self.follow = follow
+        self.requires = requires
+        self.requires_entity = requires_entity if requires_entity is not None else entity
+        self.value = None
+        self.surface = None
+
+    def get_value(self):
+        if self.component_type is None:
+            return None
+        return getattr(self.entity.get_component(self.component_type), self.attribute)
+
+    def is_visible(self) -> bool:
+        return self.requires is None or self.requires_entity.has_component(self.requires)
+
+    def get_surface(self, text_cache: TextCache) -> Surface:
+        value = self.get_value()
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = text_cache.render(self.template.format(value), self.color)
+        return self.surface
+
+    def get_position(self, scale: tuple[float, float]) -> tuple[float, float]:
+        if not self.follow:
+            return self.position
+        position = self.entity.get_component(Position)
+        return position.x * scale[0] + self.position[0], position.y * scale[1] + self.position[1]
+
+
+class HudSystem(System):
+    """Draws text widgets above the scaled canvas, all in the renderer's overlay batch."""
+
+    reads = (Score, Position, Joined)
+    writes = (Renderer,)
+
+    def __init__(self, world, renderer: Renderer, font: pygame.font.Font = None):
+        super().__init__(world)
+        self.renderer = renderer
+        if font is None:
+            font = pygame.font.SysFont(HudConstant.FONT, HudConstant.FONT_SIZE)
+        self.text_cache = TextCache(font)
+        self.widgets: list[TextWidget] = []
+
+    def add_widget(self, widget: TextWidget) -> TextWidget:
+        self.widgets.append(widget)
+        return widget
+
+    def process(self):
+        scale = self.renderer.get_scale()
+        self.renderer.overlay([(widget.get_surface(self.text_cache), widget.get_position(scale))
+                               for widget in self.widgets if widget.is_visible()])
@@ -1,6 +1,4 @@
-import pygame
-
-from common import State, Position
+from common import State, Position, KeyboardState, AnimationState
 from ecs import System
 from game.component import Invincible, PlayerTag, PlayerKeyBindings, Joined, LookingDirection, Passable
 from game.constant import ScreenConstant, GameConstant
@@ -10,6 +8,9 @@ from game.system import SPEED
 
 
 class PlayerCollisionSystem(System):
+    reads = ()
+    writes = ()
+
     def __init__(self, world):
         super().__init__(world)
         self.world.register_handler(BulletCollideWithPlayerSignal, self.on_player_collide_with_bullet)
@@ -25,7 +26,7 @@ class PlayerJoinSystem(System):
         super().__init__(world)
 
     def process(self):
-        key_pressed = pygame.key.get_pressed()
+        key_pressed = self.world.get_system(KeyboardState).key_pressed
         players = self.world.get_entities(Player)
 
         for player in players:
@@ -37,8 +38,10 @@ class PlayerJoinSystem(System):
             player.add_component(Joined())
             state = player.get_component(State)
             state.current = "join"
-            anim_state = player.get_component(State)
+            # The join animation starts on this tick, without resetting the previous one first.
+            anim_state = player.get_component(AnimationState)
             anim_state.current_state = "join"
+            player.mark_changed(State)
             player.remove_component(Passable)
             player.remove_component(Invincible)
 
@@ -48,7 +51,7 @@ class PlayerInputSystem(System):
         super().__init__(world)
 
     def process(self):
-        key_pressed = pygame.key.get_pressed()
+        key_pressed = self.world.get_system(KeyboardState).key_pressed
 
         entities = self.world.get_entities(Player)
 
@@ -103,3 +106,5 @@ class PlayerInputSystem(System):
                 position.y = 0
             if position.y > GameConstant.WIDTH_BOUNDARY:
                 position.y = GameConstant.HEIGHT_BOUNDARY
+            entity.mark_changed(State)
+            entity.mark_changed(Position)
@@ -1,14 +1,17 @@
 import pygame
 
 from game.constant import PlayerConstant, GameConstant
-from common import Position, EventQueue, State
-from game.component import CooldownDict, Score
-from ecs import System
-from game.entity import Enemy
+from common import Position, EventQueue, State, AnimationState, SpatialIndex
+from game.component import CooldownDict, CooldownScheduler, Score
+from ecs import System, Entity, EntityAddedSignal, EntityRemovedSignal
+from game.entity import Enemy, Bullet
 from game.signal import PlayerAttackSignal, EnemyDeathSignal
 
 
 class GameSystem(System):
+    reads = (EventQueue,)
+    writes = ()
+
     def __init__(self, world):
         super().__init__(world)
         self.is_running = True
@@ -28,29 +31,81 @@ class ScreenSystem(System):
 
 
 class EnemySpawnSystem(System):
+    reads = ()
+    writes = ()
+
     def __init__(self, world):
         super().__init__(world)
         self.world.register_handler(EnemyDeathSignal, self.on_enemy_death)
 
     def on_enemy_death(self, signal: EnemyDeathSignal):
-        self.world.add_entity(Enemy())
+        self.world.add_entity(Enemy(self.world.random))
+
+
+class MatchStatsSystem(System):
+    """Counts enemy kills and fired bullets over a match."""
+
+    reads = ()
+    writes = ()
+
+    def __init__(self, world):
+        super().__init__(world)
+        self.kills = 0
+        self.bullets_fired = 0
+        self.world.register_handler(EnemyDeathSignal, self.on_enemy_death)
+        self.world.register_handler(EntityAddedSignal, self.on_entity_added)
+
+    def on_enemy_death(self, signal: EnemyDeathSignal):
+        self.kills += 1
+
+    def on_entity_added(self, signal: EntityAddedSignal):
+        if isinstance(signal.entity, Bullet):
+            self.bullets_fired += 1
 
 
 class EntityCooldownSystem(System):
+    reads = ()
+    writes = (CooldownDict,)
+
     def __init__(self, world):
         super().__init__(world)
+        self.scheduler = CooldownScheduler(self.world.clock)
+        # Entity of each bound dict, to mark the dicts expired cooldowns are dropped from.
+        self.owners: dict[CooldownDict, Entity] = {}
+        self.world.register_handler(EntityAddedSignal, self.on_entity_added)
+        self.world.register_handler(EntityRemovedSignal, self.on_entity_removed)
+        for entity in self.world.query(CooldownDict):
+            self.bind(entity, entity.get_component(CooldownDict))
+
+    def bind(self, entity: Entity, cooldown_dict: CooldownDict):
+        cooldown_dict.bind(self.world.clock, self.scheduler)
+        self.owners[cooldown_dict] = entity
+
+    def on_entity_added(self, signal: EntityAddedSignal):
+        cooldown_dict = signal.entity.get_component(CooldownDict)
+        if cooldown_dict:
+            self.bind(signal.entity, cooldown_dict)
+
+    def on_entity_removed(self, signal: EntityRemovedSignal):
+        cooldown_dict = signal.entity.get_component(CooldownDict)
+        if cooldown_dict:
+            self.owners.pop(cooldown_dict, None)
 
     def process(self):
-        entities = self.world.entity_container.get_entities_with_component(CooldownDict)
-        for entity in entities:
-            cooldown_dict = entity.get_component(CooldownDict)
-            cooldown_dict.remove_expired_cooldowns()
+        expired = self.scheduler.remove_expired()
+        if expired:
+            owners = self.owners
+            self.world.mark_changed(CooldownDict, [owners[cooldown_dict] for cooldown_dict in expired
+                                                   if cooldown_dict in owners])
 
 
 SPEED = 3
 
 
 class PlayerAttackSystem(System):
+    reads = ()
+    writes = ()
+
     def __init__(self, world):
         super().__init__(world)
         self.world.register_handler(PlayerAttackSignal, self.on_player_attack)
@@ -58,14 +113,20 @@ class PlayerAttackSystem(System):
     def on_player_attack(self, player_attack_signal: PlayerAttackSignal):
         player = player_attack_signal.player
         player_position = player.get_component(Position)
-        opponents = self.world.get_entities(Enemy)
+        spatial_index = self.world.get_system(SpatialIndex)
+        if spatial_index:
+            opponents = spatial_index.query_radius(player_position, PlayerConstant.ATTACK_RANGE, Enemy)
+        else:
+            opponents = self.world.get_entities(Enemy)
         for entity in opponents:
             position = entity.get_component(Position)
             if position.distance(player_position) < PlayerConstant.ATTACK_RANGE:
                 state = entity.get_component(State)
                 state.current = "dead"
+                entity.mark_changed(State)
                 self.world.dispatch_signal(EnemyDeathSignal(entity))
                 player.get_component(Score).score += GameConstant.SCORE_PER_ENEMY
+                player.mark_changed(Score)
 
 
 class DeadEntitySystem(System):
@@ -74,6 +135,11 @@ class DeadEntitySystem(System):
         for entity in entities:
             state = entity.get_component(State)
             if state.current == "dead":
+                # Pooled entities keep their assets; the pool releases them if it drops the entity.
+                pooled = entity.pool is not None
                 self.world.remove_entity(entity)
+                animation_state = entity.get_component(AnimationState)
+                if animation_state and not pooled:
+                    animation_state.release()
 
 
@@ -12,94 +12,106 @@ def on_hurt_start(signal: PlayerHurtSignal):
     anim_state = signal.player.get_component(AnimationState)
     state.current = "hurt"
     anim_state.current_state = "hurt"
+    player.mark_changed(State)
 
     score = player.get_component(Score)
     score.score = max(0, score.score + GameConstant.SCORE_PER_HIT_BY_BULLET)
+    player.mark_changed(Score)
     player.add_component(Invincible())
     player.add_component(Passable())
 
 
 def on_hurt_end(signal: AnimationCycleCompletedSignal):
-    if signal.animation.name != "hurt":
-        return
     state = signal.entity.get_component(State)
     state.current = "idle"
     player = signal.entity
+    player.mark_changed(State)
     player.remove_component(Invincible)
     player.remove_component(Passable)
 
 
 class HurtTransitionSystem(System):
+    reads = ()
+    writes = ()
+
     def __init__(self, world):
         super().__init__(world)
         self.world.register_handler(PlayerHurtSignal, on_hurt_start)
-        self.world.register_handler(AnimationCycleCompletedSignal, on_hurt_end)
+        self.world.register_handler(AnimationCycleCompletedSignal, on_hurt_end, animation="hurt")
 
 
 def on_bullet_run(signal: AnimationCycleCompletedSignal):
-    if type(signal.entity) is not Bullet or signal.animation.name != "warm_up":
-        return
     state = signal.entity.get_component(State)
     anim_state = signal.entity.get_component(AnimationState)
     state.current = "run"
     anim_state.current_state = "run"
+    signal.entity.mark_changed(State)
 
 
 def on_bullet_explode(signal: EntityCollideSignal):
-    if type(signal.entity) is not Bullet:
-        return
     state = signal.entity.get_component(State)
     anim_state = signal.entity.get_component(AnimationState)
     state.current = "explode"
     anim_state.current_state = "explode"
+    signal.entity.mark_changed(State)
 
 
 def on_bullet_dead(signal: AnimationCycleCompletedSignal):
-    if type(signal.entity) is not Bullet or signal.animation.name != "explode":
-        return
     state = signal.entity.get_component(State)
     anim_state = signal.entity.get_component(AnimationState)
     state.current = "dead"
     anim_state.current_state = "explode"
+    signal.entity.mark_changed(State)
 
 
 class BulletTransitionSystem(System):
+    reads = ()
+    writes = ()
+
     def __init__(self, world):
         super().__init__(world)
-        self.world.register_handler(AnimationCycleCompletedSignal, on_bullet_run)
-        self.world.register_handler(EntityCollideSignal, on_bullet_explode)
-        self.world.register_handler(AnimationCycleCompletedSignal, on_bullet_dead)
+        self.world.register_handler(AnimationCycleCompletedSignal, on_bullet_run, entity_type=Bullet,
+                                   animation="warm_up")
+        self.world.register_handler(EntityCollideSignal, on_bullet_explode, entity_type=Bullet)
+        self.world.register_handler(AnimationCycleCompletedSignal, on_bullet_dead, entity_type=Bullet,
+                                   animation="explode")
 
 
 def on_player_idle(signal: AnimationCycleCompletedSignal):
-    if type(signal.entity) is not Player or signal.animation.name != "join":
-        return
     state = signal.entity.get_component(State)
     anim_state = signal.entity.get_component(AnimationState)
     state.current = "idle"
     anim_state.current_state = "idle"
+    signal.entity.mark_changed(State)
 
 
 class PlayerTransitionSystem(System):
+    reads = ()
+    writes = ()
+
     def __init__(self, world):
         super().__init__(world)
-        self.world.register_handler(AnimationCycleCompletedSignal, on_player_idle)
+        self.world.register_handler(AnimationCycleCompletedSignal, on_player_idle, entity_type=Player,
+                                   animation="join")
 
 
 def on_enemy_attack_finished(signal: AnimationCycleCompletedSignal):
-    if type(signal.entity) is not Enemy or signal.animation.name != "attack":
-        return
     enemy = signal.entity
     state = enemy.get_component(State)
     state.current = "idle"
     anim_state = enemy.get_component(AnimationState)
     anim_state.current_state = "idle"
+    enemy.mark_changed(State)
 
 
 class EnemyTransitionSystem(System):
+    reads = ()
+    writes = ()
+
     def __init__(self, world):
         super().__init__(world)
-        self.world.register_handler(AnimationCycleCompletedSignal, on_enemy_attack_finished)
+        self.world.register_handler(AnimationCycleCompletedSignal, on_enemy_attack_finished, entity_type=Enemy,
+                                   animation="attack")
 
     def process(self):
         pass
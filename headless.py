@@ -0,0 +1,150 @@
+import argparse
+import os
+import random
+import time
+
+import pygame
+
+from ecs import World
+from game.bootstrap import preload_assets, add_systems, add_entities
+from game.component import Score
+from game.entity import Enemy, Bullet
+from game.system import MatchStatsSystem
+from game.replay import InputRecorder, Replay
+from game.snapshot import SIMULATION_COMPONENTS
+from common import ScriptedInput, Renderer
+from game.constant import GameConstant
+
+
+class HeadlessRunner:
+    """Runs the game without a window, at a fixed timestep, with scripted input."""
+
+    def __init__(self, script=None, render=False, dt: float = 1 / 60, seed: int = None, record: str = None):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.init()
+        if not pygame.display.get_surface():
+            # Surfaces can only be converted once a display mode is set.
+            pygame.display.set_mode((1, 1))
+        preload_assets()
+
+        self.dt = dt
+        self.ticks = 0
+        self.renderer = None
+        if render:
+            self.renderer = Renderer(pygame.Surface((GameConstant.WIDTH_BOUNDARY, GameConstant.HEIGHT_BOUNDARY)))
+
+        if record and seed is None:
+            # Replays can only be played back in a world seeded as the recorded one was.
+            seed = random.randrange(2 ** 31)
+        self.world = World(dt, seed)
+        self.input = ScriptedInput(script)
+        self.recorder = InputRecorder(self.world, record, self.input) if record else None
+        add_systems(self.world, self.renderer, self.recorder or self.input)
+        self.world.add_system(MatchStatsSystem(self.world))
+        self.players = add_entities(self.world)
+
+    @staticmethod
+    def from_replay(replay: Replay, render=False) -> "HeadlessRunner":
+        """A runner that plays the recorded keys in the world the replay was recorded in."""
+        return HeadlessRunner(replay, render, replay.dt, replay.seed)
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def step(self):
+        self.world.process()
+        self.ticks += 1
+
+    def run(self, ticks: int, realtime: bool = False):
+        """Step the world ticks times, as fast as possible or paced to one step per dt."""
+        if not realtime:
+            for _ in range(ticks):
+                self.step()
+            return
+
+        accumulator = 0.0
+        previous = time.perf_counter()
+        target = self.ticks + ticks
+        while self.ticks < target:
+            now = time.perf_counter()
+            accumulator += now - previous
+            previous = now
+            while accumulator >= self.dt and self.ticks < target:
+                self.step()
+                accumulator -= self.dt
+            time.sleep(max(0.0, self.dt - accumulator))
+
+    def snapshot(self) -> bytes:
+        return self.world.snapshot()
+
+    def restore(self, data: bytes):
+        """Continue from a snapshot, with the script picking up at the snapshot's tick."""
+        self.world.restore(data)
+        self.ticks = self.world.clock.tick
+        self.input.tick = self.ticks
+
+    def scores(self) -> list[int]:
+        return [player.get_component(Score).score for player in self.players]
+
+    def results(self) -> dict:
+        stats = self.world.get_system(MatchStatsSystem)
+        return {
+            "ticks": self.ticks,
+            "scores": self.scores(),
+            "kills": stats.kills,
+            "bullets_fired": stats.bullets_fired,
+            "bullets_live": len(self.world.get_entities(Bullet)),
+            "enemies": len(self.world.get_entities(Enemy)),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the simulation without a display.")
+    parser.add_argument("--ticks", type=int, help="ticks to run, 3600 or the length of the replay by default")
+    parser.add_argument("--render", action="store_true", help="draw every frame to an offscreen canvas")
+    parser.add_argument("--realtime", action="store_true", help="pace the simulation to the timestep")
+    parser.add_argument("--workers", type=int, help="run systems through the scheduler with this many threads, "
+                                                    "0 to run them serially (slower than the default loop for now)")
+    parser.add_argument("--resume", help="start from a snapshot file")
+    parser.add_argument("--save", help="write a snapshot file once done")
+    parser.add_argument("--seed", type=int, help="seed of the simulation")
+    parser.add_argument("--record", help="record the players' input to a replay file")
+    parser.add_argument("--replay", help="play back a replay file")
+    parser.add_argument("--hash", action="store_true", help="print the chained hash of the simulation state")
+    args = parser.parse_args()
+
+    ticks = args.ticks
+    if args.replay:
+        replay = Replay.load(args.replay)
+        runner = HeadlessRunner.from_replay(replay, args.render)
+        ticks = ticks if ticks is not None else replay.ticks
+    else:
+        runner = HeadlessRunner(render=args.render, seed=args.seed, record=args.record)
+        ticks = ticks if ticks is not None else 3600
+    if args.resume:
+        with open(args.resume, "rb") as snapshot_file:
+            runner.restore(snapshot_file.read())
+    hasher = runner.world.enable_hashing(*SIMULATION_COMPONENTS) if args.hash else None
+    scheduler = None
+    if args.workers is not None:
+        scheduler = runner.world.enable_parallel(args.workers)
+    start = time.perf_counter()
+    runner.run(ticks, args.realtime)
+    elapsed = time.perf_counter() - start
+    runner.close()
+    print(f"{runner.ticks} ticks in {elapsed:.3f}s ({runner.ticks / elapsed:.0f} ticks/s), scores {runner.scores()}")
+    if hasher is not None:
+        print(f"state hash {hasher.chain:016x} after tick {hasher.tick}")
+    if args.save:
+        with open(args.save, "wb") as snapshot_file:
+            snapshot_file.write(runner.snapshot())
+    if scheduler is not None:
+        report = scheduler.report()
+        print(f"{len(report['waves'])} waves, critical path {report['critical_path'] * 1e3:.3f}ms "
+              f"of {report['serial_time'] * 1e3:.3f}ms serial (x{report['parallelism']:.2f})")
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,61 @@
+import argparse
+import random
+
 import pygame
 
 from ecs import World
-from game.component import PlayerKeyBindings, Passable, Invincible, Joined, Score
-from game.entity import Player, Enemy, TestEntity
-from common import AnimationPlayer, EventQueue, Position
-from game.system import PlayerInputSystem, GameSystem, PlayerAttackSystem, DeadEntitySystem, BulletMovementSystem, \
-    BulletCollisionSystem, EntityCooldownSystem, \
-    PlayerCollisionSystem, BulletRotationSystem, PlayerJoinSystem, EnemySpawnSystem
-from game.system.enemy import EnemySelectTargetSystem, EnemyVelocitySystem, EnemyPositionSystem, EnemyAttackSystem
+from game.bootstrap import preload_assets, add_systems, add_entities, add_hud
+from game.replay import InputRecorder
+from game.system import GameSystem
+from common import EventQueue, ProfilerOverlay, Renderer
 from game.constant import ScreenConstant, GameConstant
-from game.system.transition import HurtTransitionSystem, BulletTransitionSystem, PlayerTransitionSystem, \
-    EnemyTransitionSystem
+
+parser = argparse.ArgumentParser(description="Play the game.")
+parser.add_argument("--record", help="record the players' input to a replay file")
+parser.add_argument("--seed", type=int, help="seed of the simulation, picked at random when recording without one")
+args = parser.parse_args()
 
 pygame.init()
 clock = pygame.time.Clock()
 screen = pygame.display.set_mode((ScreenConstant.WIDTH, ScreenConstant.HEIGHT))
 canvas = pygame.Surface((GameConstant.WIDTH_BOUNDARY, GameConstant.HEIGHT_BOUNDARY))
+renderer = Renderer(canvas, screen)
 
 pygame.display.set_caption("Assignment 2")
-world = World()
-
-world.add_system(PlayerInputSystem(world))
-
-world.add_system(BulletRotationSystem(world))
-
-world.add_system(PlayerAttackSystem(world))
-world.add_system(PlayerCollisionSystem(world))
-world.add_system(HurtTransitionSystem(world))
-world.add_system(PlayerTransitionSystem(world))
-world.add_system(PlayerJoinSystem(world))
-
-world.add_system(DeadEntitySystem(world))
-world.add_system(BulletMovementSystem(world))
-world.add_system(BulletCollisionSystem(world))
-world.add_system(BulletTransitionSystem(world))
-
-world.add_system(EnemySelectTargetSystem(world))
-world.add_system(EnemyVelocitySystem(world))
-world.add_system(EnemyPositionSystem(world))
-world.add_system(EnemyAttackSystem(world))
-world.add_system(EnemyTransitionSystem(world))
-
-world.add_system(EventQueue(world))
-world.add_system(GameSystem(world))
-world.add_system(EntityCooldownSystem(world))
-world.add_system(AnimationPlayer(world, canvas))
-world.add_system(EnemySpawnSystem(world))
-
-player = Player()
-player.add_component(PlayerKeyBindings({
-    "UP": pygame.K_w,
-    "DOWN": pygame.K_s,
-    "LEFT": pygame.K_a,
-    "RIGHT": pygame.K_d,
-    "ATTACK": pygame.K_f,
-}))
-player.add_component(Joined())
-
-player2 = Player("waiting", "waiting")
-player2.add_component(PlayerKeyBindings({
-    "UP": pygame.K_UP,
-    "DOWN": pygame.K_DOWN,
-    "LEFT": pygame.K_LEFT,
-    "RIGHT": pygame.K_RIGHT,
-    "ATTACK": pygame.K_j,
-}))
-player2.add_component(Passable())
-player2.add_component(Invincible())
-
-world.add_entity(player)
-world.add_entity(player2)
-
-world.add_entity(Enemy())
-world.add_entity(Enemy())
-world.add_entity(Enemy())
-
-font = pygame.font.SysFont("monospace", 24)
+# Recorded matches load every animation up front, as replays do: placeholders would hold back the
+# transitions that wait on animation cycles.
+preload_assets(background=args.record is None)
+
+seed = args.seed
+if args.record and seed is None:
+    seed = random.randrange(2 ** 31)
+world = World(seed=seed)
+recorder = InputRecorder(world, args.record) if args.record else None
+add_systems(world, renderer, recorder)
+player, player2 = add_entities(world)
+add_hud(world, renderer, player, player2)
+
+# Profiling only runs while its overlay is shown.
+profiler_font = pygame.font.SysFont("monospace", 14)
+profiler_overlay = None
 
 # Game Loop
 while world.get_system(GameSystem).is_running:
-    canvas.fill((0, 0, 0))
     world.process()
-    scaled_canvas = pygame.transform.scale(canvas, screen.get_size())
-    screen.blit(scaled_canvas, (0, 0))
-
-    label = font.render("Score P1: " + str(player.get_component(Score).score), True, (255, 255, 0))
-    screen.blit(label, (10, 10))
-
-    if player2.has_component(Joined):
-        label = font.render("Score P2: " + str(player2.get_component(Score).score), True, (255, 255, 0))
-        screen.blit(label, (ScreenConstant.WIDTH - 200, 10))
-
-        player_name = font.render("P1", True, (0, 255, 255))
-        screen.blit(player_name, (player.get_component(Position).x * 2 + 15, player.get_component(Position).y * 2 - 30))
-
-        player_name = font.render("P2", True, (0, 255, 255))
-        screen.blit(player_name, (player2.get_component(Position).x * 2 + 15, player2.get_component(Position).y * 2 - 30))
-
-    pygame.display.flip()
+    for event in world.get_system(EventQueue).events:
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            if profiler_overlay is None:
+                profiler_overlay = ProfilerOverlay(world.enable_profiling(), profiler_font)
+            else:
+                world.disable_profiling()
+                profiler_overlay = None
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+            renderer.full_redraw = not renderer.full_redraw
+    if profiler_overlay is not None:
+        renderer.overlay(profiler_overlay.blits())
+    renderer.present()
+    renderer.update()
     clock.tick(60)
 
+if recorder is not None:
+    recorder.close()
@@ -0,0 +1,42 @@
+from common import AnimationState, Position, RenderOrder
+from ecs import World, Entity
+
+
+def make_entity(*components) -> Entity:
+    return Entity("actor", [Position(), *components])
+
+
+def test_entity_leaves_when_animation_state_is_removed():
+    world = World()
+    render_order = RenderOrder(world)
+    entity = make_entity(AnimationState())
+    other = make_entity(AnimationState())
+    world.add_entity(entity)
+    world.add_entity(other)
+    assert render_order.get_entities() == [entity, other]
+
+    entity.remove_component(AnimationState)
+    assert render_order.get_entities() == [other]
+
+
+def test_entity_joins_when_animation_state_is_added():
+    world = World()
+    render_order = RenderOrder(world)
+    entity = make_entity()
+    world.add_entity(entity)
+    assert render_order.get_entities() == []
+
+    entity.add_component(AnimationState())
+    assert render_order.get_entities() == [entity]
+
+
+def test_entity_rejoins_within_a_frame():
+    world = World()
+    render_order = RenderOrder(world)
+    entity = make_entity(AnimationState())
+    world.add_entity(entity)
+    render_order.get_entities()
+
+    entity.remove_component(AnimationState)
+    entity.add_component(AnimationState())
+    assert render_order.get_entities() == [entity]
@@ -0,0 +1,31 @@
+from batch import BotScript
+from game.replay import Replay
+from game.snapshot import SIMULATION_COMPONENTS
+from headless import HeadlessRunner
+
+TICKS = 900
+
+
+def play(runner: HeadlessRunner, ticks: int) -> int:
+    hasher = runner.world.enable_hashing(*SIMULATION_COMPONENTS)
+    runner.run(ticks)
+    runner.close()
+    return hasher.chain
+
+
+def test_replay_reproduces_the_recorded_match(tmp_path):
+    path = str(tmp_path / "match.rpl")
+    recorded = play(HeadlessRunner(BotScript(4), seed=4, record=path), TICKS)
+
+    replay = Replay.load(path)
+    assert (replay.seed, replay.ticks) == (4, TICKS)
+    assert play(HeadlessRunner.from_replay(replay), replay.ticks) == recorded
+
+
+def test_unseeded_recording_gets_a_seed(tmp_path):
+    path = str(tmp_path / "match.rpl")
+    recorded = play(HeadlessRunner(BotScript(5), record=path), TICKS)
+
+    replay = Replay.load(path)
+    assert replay.seed is not None
+    assert play(HeadlessRunner.from_replay(replay), replay.ticks) == recorded
@@ -0,0 +1,34 @@
+from batch import BotScript
+from game.snapshot import SIMULATION_COMPONENTS
+from headless import HeadlessRunner
+
+TICKS = 600
+
+
+def play_on(runner: HeadlessRunner, ticks: int) -> int:
+    hasher = runner.world.enable_hashing(*SIMULATION_COMPONENTS)
+    runner.run(ticks)
+    return hasher.chain
+
+
+def test_restore_replays_the_same_ticks():
+    runner = HeadlessRunner(BotScript(2), seed=2)
+    runner.run(TICKS)
+    snapshot = runner.snapshot()
+    played = play_on(runner, TICKS)
+
+    runner.restore(snapshot)
+    assert runner.snapshot() == snapshot
+    assert play_on(runner, TICKS) == played
+
+
+def test_restore_into_a_fresh_runner():
+    runner = HeadlessRunner(BotScript(3), seed=3)
+    runner.run(TICKS)
+    snapshot = runner.snapshot()
+    played = play_on(runner, TICKS)
+
+    fresh = HeadlessRunner(BotScript(3), seed=30)
+    fresh.restore(snapshot)
+    assert fresh.snapshot() == snapshot
+    assert play_on(fresh, TICKS) == played
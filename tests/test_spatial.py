@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from common import Position, SpatialIndex
+from ecs import World, Entity
+
+
+class Ball(Entity):
+    def __init__(self, x: float, y: float):
+        position = Position()
+        position.x, position.y, position.w, position.h = x, y, 16, 16
+        super().__init__("ball", [position])
+
+
+class Box(Entity):
+    def __init__(self, x: float, y: float):
+        position = Position()
+        position.x, position.y, position.w, position.h = x, y, 32, 32
+        super().__init__("box", [position])
+
+
+def make_world(seed: int) -> tuple[World, SpatialIndex, random.Random]:
+    rng = random.Random(seed)
+    world = World()
+    spatial_index = SpatialIndex(world)
+    world.add_system(spatial_index)
+    for _ in range(150):
+        world.add_entity(Ball(rng.uniform(-50, 850), rng.uniform(-50, 650)))
+        world.add_entity(Box(rng.uniform(-50, 850), rng.uniform(-50, 650)))
+    world.process()
+    return world, spatial_index, rng
+
+
+def make_probe(rng: random.Random) -> Position:
+    probe = Position()
+    probe.x, probe.y = rng.uniform(-50, 850), rng.uniform(-50, 650)
+    return probe
+
+
+def scan(world: World, position: Position, radius: float, entity_type: type = None) -> list[Entity]:
+    found = [entity for entity in world.get_entities(entity_type)
+             if position.distance(entity.get_component(Position)) < radius]
+    return sorted(found, key=lambda entity: entity.id)
+
+
+@pytest.mark.parametrize("radius", [5, 16, 40, 120])
+def test_query_radius_matches_a_full_scan(radius):
+    world, spatial_index, rng = make_world(radius)
+    for _ in range(30):
+        probe = make_probe(rng)
+        assert spatial_index.query_radius(probe, radius) == scan(world, probe, radius)
+        assert spatial_index.query_radius(probe, radius, Ball) == scan(world, probe, radius, Ball)
+
+
+def test_query_pairs_matches_a_full_scan():
+    world, spatial_index, _ = make_world(7)
+    expected = [(ball, box) for box in world.get_entities(Box)
+                for ball in scan(world, box.get_component(Position), 30, Ball)]
+    assert spatial_index.query_pairs(Ball, Box, 30) == expected
+
+
+def test_moved_added_and_removed_entities_are_found_after_the_next_update():
+    world, spatial_index, rng = make_world(11)
+    for entity in rng.sample(world.get_entities(), 100):
+        position = entity.get_component(Position)
+        position.x, position.y = rng.uniform(-50, 850), rng.uniform(-50, 650)
+        entity.mark_changed(Position)
+    for entity in rng.sample(world.get_entities(), 20):
+        world.remove_entity(entity)
+    for _ in range(20):
+        world.add_entity(Ball(rng.uniform(-50, 850), rng.uniform(-50, 650)))
+    world.process()
+
+    for _ in range(30):
+        probe = make_probe(rng)
+        assert spatial_index.query_radius(probe, 40) == scan(world, probe, 40)
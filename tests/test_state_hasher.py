@@ -0,0 +1,31 @@
+from batch import BotScript
+from ecs import StateHasher
+from game.snapshot import SIMULATION_COMPONENTS
+from headless import HeadlessRunner
+
+
+def full_hash(hasher: StateHasher, runner: HeadlessRunner) -> int:
+    entities = runner.world.entity_container.entities.values()
+    return sum(hasher.digest(entity) for entity in entities) & 0xFFFFFFFFFFFFFFFF
+
+
+def test_incremental_hash_matches_a_full_recompute():
+    runner = HeadlessRunner(BotScript(6), seed=6)
+    hasher = runner.world.enable_hashing(*SIMULATION_COMPONENTS)
+    for _ in range(900):
+        runner.step()
+        assert hasher.hash == full_hash(hasher, runner)
+
+
+def test_incremental_hash_matches_a_full_recompute_across_a_restore():
+    runner = HeadlessRunner(BotScript(8), seed=8)
+    runner.run(300)
+    snapshot = runner.snapshot()
+    hasher = runner.world.enable_hashing(*SIMULATION_COMPONENTS)
+    runner.run(300)
+
+    runner.restore(snapshot)
+    assert hasher.update(runner.world) == full_hash(hasher, runner)
+    for _ in range(300):
+        runner.step()
+        assert hasher.hash == full_hash(hasher, runner)